@@ -0,0 +1,56 @@
+"""
+Every pair's closes on one shared time index.
+
+Yahoo FX tickers do not always print the same bars, so plotting each pair's own series
+against the first pair's dates drifts out of line. ``align_closes`` outer-joins the close
+series of all pairs and forward-fills the gaps (``EXCHANGE_FFILL_LIMIT`` bars at most, unset
+for no limit, 0 to keep the gaps). The result is one contiguous ``(pairs, bars)`` float
+matrix, and the multi-pair panels read their rows from it.
+"""
+
+import os
+from dataclasses import dataclass
+
+import numpy as np
+import pandas as pd
+
+# Longest run of missing bars that is filled with the previous close (None: no limit, 0: never fill)
+_limit = os.environ.get("EXCHANGE_FFILL_LIMIT", "")
+DEFAULT_FILL_LIMIT = int(_limit) if _limit else None
+
+
+@dataclass(frozen=True)
+class AlignedCloses:
+    pairs: tuple  # row order of the matrices
+    index: pd.DatetimeIndex  # union of every pair's bars, sorted
+    close: np.ndarray  # (pairs, bars) C-contiguous, forward-filled, NaN before a pair's first bar
+    observed: np.ndarray  # (pairs, bars) bool, True where the pair printed a bar of its own
+
+    def raw(self):
+        """``close`` without the filled values: NaN wherever the pair had no bar."""
+        return np.where(self.observed, self.close, np.nan)
+
+    def row(self, pair):
+        return self.close[self.pairs.index(pair)]
+
+
+def align_closes(exchange_data, fill_limit=DEFAULT_FILL_LIMIT):
+    """Join the ``Close`` column of every non-empty frame in ``{pair: DataFrame}`` onto one index."""
+    closes = {pair: data["Close"] for pair, data in exchange_data.items() if not data.empty}
+    if not closes:
+        return AlignedCloses((), pd.DatetimeIndex([]), np.empty((0, 0)), np.empty((0, 0), dtype=bool))
+
+    wide = pd.concat(closes, axis=1).sort_index()  # outer join
+    observed = wide.notna().to_numpy().T
+    if fill_limit != 0:
+        wide = wide.ffill(limit=fill_limit)
+    close = np.ascontiguousarray(wide.to_numpy(dtype=float).T)
+    return AlignedCloses(tuple(closes), wide.index, close, np.ascontiguousarray(observed))
+
+
+def change_percent(close):
+    """Bar-to-bar change % along the last axis, same arithmetic as ``pct_change() * 100``; first bar NaN."""
+    returns = np.full_like(close, np.nan)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        returns[..., 1:] = (close[..., 1:] / close[..., :-1] - 1) * 100
+    return returns
@@ -0,0 +1,202 @@
+"""
+Memory-mapped historical archive for multi-year ranges.
+
+Yahoo serves hourly bars for the last 730 days only, and a wide sidebar range otherwise means a
+large download. The archive keeps offline dumps as fixed-width arrays per (interval, pair)::
+
+    <root>/<interval>/<ticker>.times.npy   (bars,) int64 epoch nanoseconds, sorted
+    <root>/<interval>/<ticker>.ohlc.npy    (4, bars) float Open/High/Low/Close
+    <root>/<interval>/<ticker>.json        {"tz": ..., "bars": ...}
+
+Both arrays are opened with ``mmap_mode="r"``: slicing a date range is a binary search on the
+time axis and a view of the mapped block, so only the pages of the requested window are ever
+read. ``ArchiveProvider`` serves archived bars and asks the wrapped provider only for what lies
+outside the archive (usually the recent tail).
+
+Bulk import from CSV or Parquet dumps (Parquet needs pyarrow)::
+
+    python archive.py import dumps/*.csv --interval 1h
+    python archive.py import EURTHB.parquet --ticker EURTHB=X --interval 1d
+    python archive.py list
+"""
+
+import argparse
+import json
+import os
+import threading
+
+import numpy as np
+import pandas as pd
+
+from bar_store import _as_date, merge_bars
+from compact import BAR_COLUMNS, CompactBars
+
+DEFAULT_ARCHIVE_DIR = ".bar_archive"
+# Timezone of Yahoo FX bars, used when a dump's timestamps carry none
+DEFAULT_ARCHIVE_TZ = "Europe/London"
+
+
+def _safe(ticker):
+    return "".join(c if c.isalnum() else "_" for c in ticker)
+
+
+class Archive:
+    def __init__(self, root=None):
+        self.root = root or os.environ.get("EXCHANGE_ARCHIVE_DIR", DEFAULT_ARCHIVE_DIR)
+        self._open = {}  # (ticker, interval) -> (mtime, CompactBars over the mapped files)
+        self._lock = threading.Lock()
+
+    def _paths(self, ticker, interval):
+        base = os.path.join(self.root, interval, _safe(ticker))
+        return base + ".times.npy", base + ".ohlc.npy", base + ".json"
+
+    def bars(self, ticker, interval):
+        """Every archived bar as a ``CompactBars`` over the memory-mapped files, ``None`` if not archived."""
+        times_path, ohlc_path, meta_path = self._paths(ticker, interval)
+        try:
+            mtime = os.stat(meta_path).st_mtime_ns
+        except OSError:
+            return None
+        key = (ticker, interval)
+        with self._lock:
+            opened = self._open.get(key)
+            if opened is None or opened[0] != mtime:
+                with open(meta_path) as f:
+                    meta = json.load(f)
+                times, ohlc = np.load(times_path, mmap_mode="r"), np.load(ohlc_path, mmap_mode="r")
+                opened = self._open[key] = (mtime, CompactBars(times, ohlc, meta["tz"]))
+        return opened[1]
+
+    def window(self, ticker, interval, start=None, end=None):
+        """Archived bars from day ``start`` up to (excluding) day ``end``, zero-copy; ``None`` if not archived."""
+        bars = self.bars(ticker, interval)
+        if bars is None:
+            return None
+        return bars.slice(None if start is None else pd.Timestamp(_as_date(start)),
+                          None if end is None else pd.Timestamp(_as_date(end)))
+
+    def write(self, ticker, interval, frame, tz=None):
+        """Merge an OHLC ``frame`` into the archive (its bars win over archived ones at the same time)."""
+        existing = self.bars(ticker, interval)
+        frames = [frame[BAR_COLUMNS]]
+        if existing is not None and len(existing):
+            frames.insert(0, existing.frame())
+            tz = tz or existing.tz
+        merged = merge_bars(frames)
+        index = pd.DatetimeIndex(merged.index)
+        if index.tz is None:
+            index = index.tz_localize(tz or DEFAULT_ARCHIVE_TZ)
+        tz = tz or str(index.tz)
+        bars = CompactBars.from_arrays(index.as_unit("ns").asi8, merged[BAR_COLUMNS].to_numpy(dtype=float).T, tz)
+
+        times_path, ohlc_path, meta_path = self._paths(ticker, interval)
+        os.makedirs(os.path.dirname(times_path), exist_ok=True)
+        # Write-then-rename; the JSON goes last, its mtime tells readers to remap
+        for path, array in ((times_path, bars.times), (ohlc_path, bars.values)):
+            with open(path + ".tmp", "wb") as f:
+                np.save(f, array)
+            os.replace(path + ".tmp", path)
+        with open(meta_path + ".tmp", "w") as f:
+            json.dump({"ticker": ticker, "tz": tz, "bars": len(bars)}, f)
+        os.replace(meta_path + ".tmp", meta_path)
+        return len(bars)
+
+    def entries(self):
+        """``(interval, ticker, bars, first, last)`` of everything archived."""
+        if not os.path.isdir(self.root):
+            return []
+        rows = []
+        for interval in sorted(os.listdir(self.root)):
+            folder = os.path.join(self.root, interval)
+            for name in sorted(n for n in os.listdir(folder) if n.endswith(".json")):
+                with open(os.path.join(folder, name)) as f:
+                    ticker = json.load(f)["ticker"]
+                bars = self.bars(ticker, interval)
+                first, last = (pd.Timestamp(t, tz="UTC").tz_convert(bars.tz) for t in bars.times[[0, -1]]) if len(bars) else (None, None)
+                rows.append((interval, ticker, len(bars), first, last))
+        return rows
+
+
+class ArchiveProvider:
+    """Provider wrapper serving archived bars; only the days outside the archive reach ``provider``."""
+
+    def __init__(self, provider, archive=None):
+        self.provider = provider
+        self.archive = archive or Archive()
+        self.name = f"archive:{getattr(provider, 'name', 'provider')}"
+
+    def history(self, ticker, start=None, end=None, interval="1h", period=None):
+        archived = None if period is not None or start is None or end is None else self.archive.bars(ticker, interval)
+        if archived is None or not len(archived):
+            return self.provider.history(ticker, start=start, end=end, interval=interval, period=period)
+
+        start, end = _as_date(start), _as_date(end)
+        window = self.archive.window(ticker, interval, start, end)
+        first_day, last_day = (pd.Timestamp(t, tz="UTC").tz_convert(archived.tz).date() for t in archived.times[[0, -1]])
+        # The archive's last day may be incomplete, so it is fetched again along with anything newer
+        edges = [(start, min(end, first_day)), (max(start, last_day), end)]
+        fetched = [self.provider.history(ticker, start=lo, end=hi, interval=interval) for lo, hi in edges if lo < hi]
+        fetched = [frame[BAR_COLUMNS] for frame in fetched if not frame.empty]
+        if not fetched:
+            return window.frame()  # Entirely inside the archive: a view of the mapped pages
+        return merge_bars([window.frame()] + fetched)
+
+
+# --- Bulk import ---
+def read_dump(path, tz=DEFAULT_ARCHIVE_TZ):
+    """
+    OHLC frame of a CSV or Parquet dump; the index is the first column (or a Date/Datetime
+    column). Timestamps without an offset are taken to be in ``tz``.
+    """
+    if path.endswith((".parquet", ".pq")):
+        frame = pd.read_parquet(path)
+    else:
+        frame = pd.read_csv(path)
+    names = {column.lower(): column for column in frame.columns}
+    time_column = next((names[n] for n in ("datetime", "date", "timestamp", "time") if n in names), None)
+    if time_column is not None:
+        frame = frame.set_index(time_column)
+    elif not isinstance(frame.index, pd.DatetimeIndex):
+        frame = frame.set_index(frame.columns[0])
+    frame = frame.rename(columns={names[c.lower()]: c for c in BAR_COLUMNS if c.lower() in names})
+    missing = [c for c in BAR_COLUMNS if c not in frame.columns]
+    if missing:
+        raise ValueError(f"{path}: no {', '.join(missing)} column")
+    try:
+        index = pd.DatetimeIndex(pd.to_datetime(frame.index))
+        index = index.tz_localize(tz) if index.tz is None else index
+    except (ValueError, TypeError):
+        # Offsets change with DST, so parse as UTC rather than a fixed-offset zone
+        index = pd.DatetimeIndex(pd.to_datetime(frame.index, utc=True))
+    return pd.DataFrame(frame[BAR_COLUMNS].to_numpy(dtype=float), index=pd.DatetimeIndex(index, name="Datetime"), columns=BAR_COLUMNS)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--root", help=f"Archive directory (EXCHANGE_ARCHIVE_DIR, default {DEFAULT_ARCHIVE_DIR})")
+    commands = parser.add_subparsers(dest="command", required=True)
+    importer = commands.add_parser("import", help="Merge CSV/Parquet dumps into the archive")
+    importer.add_argument("paths", nargs="+")
+    importer.add_argument("--interval", default="1h", choices=["1h", "1d", "1wk"])
+    importer.add_argument("--ticker", help="Ticker of a single dump (default: the file name, e.g. EURTHB=X.csv)")
+    importer.add_argument("--tz", default=DEFAULT_ARCHIVE_TZ, help="Timezone the bars are shown and sliced in")
+    commands.add_parser("list", help="Show what is archived")
+    args = parser.parse_args(argv)
+
+    archive = Archive(args.root)
+    if args.command == "list":
+        for interval, ticker, bars, first, last in archive.entries():
+            print(f"{interval:>3} {ticker:<12} {bars:9d} bars  {first} .. {last}")
+        return
+
+    if args.ticker and len(args.paths) > 1:
+        parser.error("--ticker only applies to a single dump")
+    for path in args.paths:
+        ticker = args.ticker or os.path.splitext(os.path.basename(path))[0]
+        frame = read_dump(path, args.tz).tz_convert(args.tz)
+        total = archive.write(ticker, args.interval, frame, args.tz)
+        print(f"{path}: {len(frame)} bars -> {ticker} {args.interval} ({total} archived)")
+
+
+if __name__ == "__main__":
+    main()
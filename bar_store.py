@@ -0,0 +1,203 @@
+"""
+Persistent on-disk OHLC store with incremental gap-filling.
+
+Bars are kept in one pickle file per (interval, ticker), next to a JSON index of the date
+ranges already downloaded. A request only fetches the edges it does not hold yet, so
+sliding the sidebar window or restarting the server costs a small delta fetch instead of
+a full history pull. ``BarStore`` implements the provider interface, so it can be handed
+to ``fetch_all`` in place of the upstream provider.
+
+The store doubles as the cache shared between sessions and server processes: every
+(interval, ticker) entry is guarded by a thread lock plus an ``flock`` on a lock file, and
+the still-moving live edge is reused for ``live_ttl`` seconds. Concurrent identical requests,
+from threads or from other workers pointed at the same directory, therefore wait on the
+one in-flight download and then read its result instead of starting their own.
+"""
+
+import json
+import os
+import threading
+import time
+from contextlib import contextmanager
+from datetime import date, datetime, timedelta, timezone
+
+try:
+    import fcntl
+except ImportError:  # Windows: only threads of one process are coalesced
+    fcntl = None
+
+import pandas as pd
+
+from data_provider import OHLC_COLUMNS, market_closed
+
+DEFAULT_STORE_DIR = ".bar_store"
+# Seconds a fetch of today's (still-moving) bars is reused by other requests
+DEFAULT_LIVE_TTL = 60
+
+
+class BarStore:
+    def __init__(self, provider, root=None, live_ttl=DEFAULT_LIVE_TTL):
+        self.provider = provider
+        self.root = root or os.environ.get("EXCHANGE_STORE_DIR", DEFAULT_STORE_DIR)
+        self.live_ttl = live_ttl
+        self.name = f"store:{getattr(provider, 'name', 'provider')}"
+        self._locks = {}
+        self._locks_guard = threading.Lock()
+
+    # --- Provider interface ---
+    def history(self, ticker, start=None, end=None, interval="1h", period=None):
+        if period is not None or start is None or end is None:
+            # Relative periods move with the clock, nothing stable to store
+            return self.provider.history(ticker, start=start, end=end, interval=interval, period=period)
+
+        start, end = _as_date(start), _as_date(end)
+        with self._lock(ticker, interval):
+            # Loaded under the lock: whoever held it before may just have filled our range
+            bars, covered, live = self._load(ticker, interval)
+            missing = missing_ranges(covered, start, end)
+            if live is not None and time.time() - live[2] < self.live_ttl:
+                missing = [(lo, hi) for lo, hi in missing if not (live[0] <= lo and hi <= live[1])]
+            if missing:
+                fetched = [self._fetch(ticker, lo, hi, interval) for lo, hi in missing]
+                bars = merge_bars([bars] + fetched)
+                # Bars from today onwards are still moving, so they are never marked as held;
+                # "today" is taken in the bars' timezone, the one slice_bars buckets days in.
+                # Failed fetches (None) stay missing, and so does an empty answer unless the
+                # market was closed the whole range (weekends, holidays): for a range that
+                # trades it is Yahoo's way of failing, and holding it would hide the bars for good.
+                answered = [frame is not None and (not frame.empty or market_closed(lo, hi))
+                            for (lo, hi), frame in zip(missing, fetched)]
+                settled = settled_before(bars)
+                covered = merge_ranges(covered + [
+                    (lo, min(hi, settled)) for (lo, hi), ok in zip(missing, answered) if lo < settled and ok
+                ])
+                for (lo, hi), frame in zip(missing, fetched):
+                    if hi > settled and frame is not None:  # Reused for live_ttl only, never held
+                        live = (lo, hi, time.time())
+                self._save(ticker, interval, bars, covered, live)
+        return slice_bars(bars, start, end)
+
+    def _fetch(self, ticker, start, end, interval):
+        try:
+            return self.provider.history(ticker, start=start, end=end, interval=interval)
+        except Exception:
+            # Upstream down (or its circuit open): serve the bars already held, the range stays missing
+            return None
+
+    def covered_ranges(self, ticker, interval):
+        return self._load(ticker, interval)[1]
+
+    # --- Files ---
+    def _paths(self, ticker, interval):
+        folder = os.path.join(self.root, interval)
+        safe = "".join(c if c.isalnum() else "_" for c in ticker)
+        return tuple(os.path.join(folder, f"{safe}.{ext}") for ext in ("pkl", "json", "lock"))
+
+    def _load(self, ticker, interval):
+        bars_path, index_path, _ = self._paths(ticker, interval)
+        if not (os.path.exists(bars_path) and os.path.exists(index_path)):
+            return None, [], None
+        try:
+            bars = pd.read_pickle(bars_path)
+            with open(index_path) as f:
+                index = json.load(f)
+            covered = [(date.fromisoformat(lo), date.fromisoformat(hi)) for lo, hi in index["covered"]]
+            live = index.get("live")
+            if live is not None:
+                live = (date.fromisoformat(live[0]), date.fromisoformat(live[1]), float(live[2]))
+        except (OSError, ValueError, KeyError, EOFError):
+            # A damaged entry is simply re-downloaded
+            return None, [], None
+        return bars, covered, live
+
+    def _save(self, ticker, interval, bars, covered, live=None):
+        bars_path, index_path, _ = self._paths(ticker, interval)
+        os.makedirs(os.path.dirname(bars_path), exist_ok=True)
+        # Write-then-rename so a concurrent reader never sees a half-written file
+        bars.to_pickle(bars_path + ".tmp")
+        os.replace(bars_path + ".tmp", bars_path)
+        index = {"covered": [[lo.isoformat(), hi.isoformat()] for lo, hi in covered]}
+        if live is not None:
+            index["live"] = [live[0].isoformat(), live[1].isoformat(), live[2]]
+        with open(index_path + ".tmp", "w") as f:
+            json.dump(index, f)
+        os.replace(index_path + ".tmp", index_path)
+
+    @contextmanager
+    def _lock(self, ticker, interval):
+        with self._locks_guard:
+            thread_lock = self._locks.setdefault((ticker, interval), threading.Lock())
+        with thread_lock:
+            if fcntl is None:
+                yield
+                return
+            lock_path = self._paths(ticker, interval)[2]
+            os.makedirs(os.path.dirname(lock_path), exist_ok=True)
+            with open(lock_path, "a") as handle:
+                fcntl.flock(handle, fcntl.LOCK_EX)  # Other server processes wait here
+                try:
+                    yield
+                finally:
+                    fcntl.flock(handle, fcntl.LOCK_UN)
+
+
+# --- Range bookkeeping ---
+def _as_date(value):
+    if isinstance(value, pd.Timestamp):
+        return value.date()
+    if isinstance(value, date):
+        return value if type(value) is date else value.date()
+    return date.fromisoformat(str(value)[:10])
+
+
+def settled_before(bars):
+    """First day whose bars may still move: today in the bars' timezone, or in UTC-12 (the last day to end) when unknown."""
+    tz = getattr(bars.index, "tz", None)
+    if tz is None:
+        return (datetime.now(timezone.utc) - timedelta(hours=12)).date()
+    return pd.Timestamp.now(tz=tz).date()
+
+
+def merge_ranges(ranges):
+    merged = []
+    for lo, hi in sorted(r for r in ranges if r[0] < r[1]):
+        if merged and lo <= merged[-1][1]:
+            merged[-1] = (merged[-1][0], max(merged[-1][1], hi))
+        else:
+            merged.append((lo, hi))
+    return merged
+
+
+def missing_ranges(covered, start, end):
+    """Half-open ``[start, end)`` date ranges not contained in ``covered``."""
+    missing = []
+    cursor = start
+    for lo, hi in merge_ranges(covered):
+        if hi <= cursor:
+            continue
+        if lo >= end:
+            break
+        if lo > cursor:
+            missing.append((cursor, lo))
+        cursor = max(cursor, hi)
+    if cursor < end:
+        missing.append((cursor, end))
+    return missing
+
+
+def merge_bars(frames):
+    frames = [f for f in frames if f is not None and not f.empty]
+    if not frames:
+        return pd.DataFrame(columns=OHLC_COLUMNS)
+    bars = pd.concat(frames)
+    # Later downloads win, they carry the corrected version of a bar
+    bars = bars[~bars.index.duplicated(keep="last")]
+    return bars.sort_index()
+
+
+def slice_bars(bars, start, end):
+    if bars is None or bars.empty:
+        return merge_bars([])
+    days = bars.index.tz_localize(None).normalize() if bars.index.tz is not None else bars.index.normalize()
+    mask = (days >= pd.Timestamp(start)) & (days < pd.Timestamp(end))
+    return bars[mask]
@@ -0,0 +1,284 @@
+"""
+Headless benchmark of the whole dashboard script.
+
+Renders ``main.py`` with Streamlit's ``AppTest`` against synthetic bars (``FakeProvider``) or
+recorded CSV fixtures, for every combination of pair count, date range and interval, and
+reports per-panel wall time, peak memory and chart payload bytes. Results are written to
+``bench_results/<commit>.json`` so a later commit can be compared against them::
+
+    python bench_dashboard.py                          # run the default grid
+    python bench_dashboard.py --compare <commit>       # ... and diff against a stored run
+    python bench_dashboard.py record fixtures/ --days 365   # save fixtures from EXCHANGE_PROVIDER
+    EXCHANGE_PROVIDER=recorded EXCHANGE_FIXTURE_DIR=fixtures/ python bench_dashboard.py --end 2025-03-01
+    python bench_dashboard.py startup                  # cold-start budget check, exits 1 when over budget
+"""
+
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+from datetime import date, timedelta
+
+ROOT = os.path.dirname(os.path.abspath(__file__))
+RESULTS_DIR = os.path.join(ROOT, "bench_results")
+# THB legs of the benchmark universe; the crosses between them are derived, so 10 legs give 100 pairs
+LEGS = ["EUR", "JPY", "GBP", "AUD", "USD", "CNY", "CHF", "SGD", "HKD", "KRW"]
+ALL_PAIRS = [f"{leg}/THB" for leg in LEGS] + [f"{base}/{quote}" for base in LEGS for quote in LEGS if base != quote]
+
+
+def write_universe(path):
+    with open(path, "w") as f:
+        json.dump({"pivot": "THB", "legs": LEGS, "pairs": ALL_PAIRS}, f)
+
+
+# --- Chart recorder ---
+class ChartRecorder:
+    """
+    Wraps ``st_echarts`` to time every panel of a script run.
+
+    A panel's wall time runs from the end of the previous chart (or the start of the run) to
+    the end of its own ``st_echarts`` call, so it covers the data shaping done for that chart.
+    """
+
+    def __init__(self, render):
+        self.render = render
+        self.panels = []
+        self.mark = time.perf_counter()
+
+    def reset(self):
+        self.panels = []
+        self.mark = time.perf_counter()
+
+    def __call__(self, options, *args, **kwargs):
+        result = self.render(options, *args, **kwargs)
+        now = time.perf_counter()
+        series = options.get("series") or [{}]
+        series = series if isinstance(series, list) else [series]
+        self.panels.append({
+            "panel": f"{len(self.panels)}:{series[0].get('type', 'chart')}",
+            "seconds": now - self.mark,
+            "payload_bytes": len(json.dumps(options, default=str)),
+        })
+        self.mark = now
+        return result
+
+
+def _install_recorder(app):
+    # streamlit_echarts can only be imported inside a script run, so the first run loads it
+    module = sys.modules["streamlit_echarts"]
+    if not isinstance(module.st_echarts, ChartRecorder):
+        module.st_echarts = ChartRecorder(module.st_echarts)
+    return module.st_echarts
+
+
+# --- Scenarios ---
+def run_scenario(app, recorder, pairs, days, interval, end_date):
+    os.environ["EXCHANGE_PAIRS"] = ",".join(ALL_PAIRS[:pairs])
+    app.sidebar.date_input[0].set_value(end_date - timedelta(days=days))
+    app.sidebar.date_input[1].set_value(end_date)
+    app.sidebar.selectbox[0].set_value(interval)
+
+    # Cold: first render of this window, includes the upstream fetch and the stats pass
+    recorder.reset()
+    cold_seconds = _run(app)
+    # Warm: what every later interaction costs, timed without the tracer's overhead
+    recorder.reset()
+    warm_seconds = _run(app)
+    panels = recorder.panels
+    tail_seconds = time.perf_counter() - recorder.mark
+
+    tracemalloc.start()
+    try:
+        _run(app)
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+
+    return {
+        "pairs": pairs,
+        "days": days,
+        "interval": interval,
+        "cold_seconds": cold_seconds,
+        "warm_seconds": warm_seconds,
+        "peak_memory_bytes": peak,
+        "payload_bytes": sum(p["payload_bytes"] for p in panels),
+        "panels": panels + [{"panel": "tail", "seconds": tail_seconds, "payload_bytes": 0}],
+    }
+
+
+def _run(app):
+    start = time.perf_counter()
+    app.run()
+    if app.exception:
+        raise RuntimeError(f"Dashboard raised: {app.exception[0].value}")
+    return time.perf_counter() - start
+
+
+def run_grid(pair_counts, ranges, intervals, end_date):
+    from streamlit.testing.v1 import AppTest
+
+    results = []
+    with tempfile.TemporaryDirectory() as store:
+        os.environ.setdefault("EXCHANGE_PROVIDER", "fake")
+        os.environ["EXCHANGE_STORE_DIR"] = store
+        os.environ["EXCHANGE_UNIVERSE"] = os.path.join(store, "universe.json")
+        write_universe(os.environ["EXCHANGE_UNIVERSE"])
+        app = AppTest.from_file(os.path.join(ROOT, "main.py"), default_timeout=600)
+        _run(app)
+        recorder = _install_recorder(app)
+        for pairs in pair_counts:
+            for days in ranges:
+                for interval in intervals:
+                    result = run_scenario(app, recorder, pairs, days, interval, end_date)
+                    results.append(result)
+                    print(f"{pairs} pairs, {days:4d} days, {interval:>3}: cold {result['cold_seconds'] * 1000:7.0f} ms, "
+                          f"warm {result['warm_seconds'] * 1000:7.0f} ms, peak {result['peak_memory_bytes'] / 2**20:6.1f} MiB, "
+                          f"payload {result['payload_bytes'] / 1024:7.1f} KiB")
+    return results
+
+
+# --- Results per commit ---
+def current_commit():
+    try:
+        commit = subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=ROOT, capture_output=True, text=True, check=True).stdout.strip()
+        dirty = subprocess.run(["git", "status", "--porcelain", "--untracked-files=no"], cwd=ROOT, capture_output=True, text=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown"
+    return commit + ("-dirty" if dirty else "")
+
+
+def save_results(results, commit):
+    os.makedirs(RESULTS_DIR, exist_ok=True)
+    path = os.path.join(RESULTS_DIR, f"{commit}.json")
+    with open(path, "w") as f:
+        json.dump({"commit": commit, "python": sys.version.split()[0], "scenarios": results}, f, indent=1)
+    return path
+
+
+def compare(results, baseline_commit):
+    with open(os.path.join(RESULTS_DIR, f"{baseline_commit}.json")) as f:
+        baseline = {(s["pairs"], s["days"], s["interval"]): s for s in json.load(f)["scenarios"]}
+    print(f"\nvs {baseline_commit} (new / old):")
+    for result in results:
+        old = baseline.get((result["pairs"], result["days"], result["interval"]))
+        if old is None:
+            continue
+        ratios = [f"{key.split('_')[0]} x{result[key] / old[key]:.2f}" for key in ("warm_seconds", "peak_memory_bytes", "payload_bytes") if old[key]]
+        print(f"{result['pairs']} pairs, {result['days']:4d} days, {result['interval']:>3}: " + ", ".join(ratios))
+
+
+# --- Startup budget ---
+# Seconds a cold worker may spend until the page shell is drawn, on the heavy imports after it,
+# and on its whole first render (synthetic bars, so no network time)
+STARTUP_BUDGET = {"shell": 0.25, "imports": 2.0, "first_run": 10.0}
+_SCRIPT_RUN_MARK = "-- script run --"
+
+
+def _startup_child():
+    # Fresh interpreter: streamlit is already loaded in a real worker, everything main.py imports is not
+    from streamlit.testing.v1 import AppTest
+
+    app = AppTest.from_file(os.path.join(ROOT, "main.py"), default_timeout=600)
+    print(_SCRIPT_RUN_MARK, file=sys.stderr, flush=True)
+    first_run = _run(app)
+    from instrumentation import REGISTRY
+
+    totals = REGISTRY.totals()
+    print(json.dumps({"first_run": first_run, **{name: totals[name]["seconds"] for name in ("shell", "imports", "fetch")}}))
+
+
+def import_breakdown(importtime_log, top=10):
+    """``[(seconds, module)]`` of the top-level imports after the script run mark, slowest first."""
+    lines = importtime_log.split(_SCRIPT_RUN_MARK, 1)[-1].splitlines()
+    rows = []
+    for line in lines:
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        _, cumulative, name = line.split("|", 2)
+        if not name.startswith("  "):  # Nested imports are indented further
+            rows.append((int(cumulative) / 1e6, name.strip()))
+    return sorted(rows, reverse=True)[:top]
+
+
+def check_startup(budget):
+    """Cold render of main.py in a fresh process, compared to ``budget``; True when within it."""
+    with tempfile.TemporaryDirectory() as store:
+        env = dict(os.environ, EXCHANGE_PROVIDER=os.environ.get("EXCHANGE_PROVIDER", "fake"), EXCHANGE_STORE_DIR=store)
+        child = subprocess.run([sys.executable, "-X", "importtime", __file__, "_startup-child"],
+                               cwd=ROOT, env=env, capture_output=True, text=True)
+    if child.returncode:
+        raise RuntimeError(f"Startup run failed:\n{child.stderr[-2000:]}")
+    timings = json.loads(child.stdout.strip().splitlines()[-1])
+
+    print("slowest imports of the first script run:")
+    for seconds, module in import_breakdown(child.stderr):
+        print(f"  {seconds * 1000:7.1f} ms  {module}")
+    within = True
+    for name, seconds in timings.items():
+        limit = budget.get(name)
+        over = limit is not None and seconds > limit
+        within &= not over
+        print(f"{name:>9}: {seconds * 1000:7.0f} ms" + (f" (budget {limit * 1000:.0f} ms{', OVER' if over else ''})" if limit is not None else ""))
+    return within
+
+
+# --- Fixtures ---
+def record_fixtures(root, days, intervals, end_date):
+    """Save ``days`` of bars per pair and interval from the configured provider as CSV fixtures."""
+    sys.path.insert(0, ROOT)
+    from data_provider import fetch_all, get_provider, recorded_path
+
+    tickers = [f"{leg}THB=X" for leg in LEGS]
+    for interval in intervals:
+        # Yahoo serves hourly bars for the last 730 days only
+        start_date = end_date - timedelta(days=min(days, 729) if interval == "1h" else days)
+        for ticker, frame in fetch_all(get_provider(), tickers, start=start_date, end=end_date, interval=interval).items():
+            path = recorded_path(root, ticker, interval)
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            frame.to_csv(path)
+            print(f"{path}: {len(frame)} bars")
+
+
+def _csv(cast):
+    return lambda text: [cast(v) for v in text.split(",")]
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("command", nargs="?", default="run", choices=["run", "record", "startup", "_startup-child"])
+    parser.add_argument("fixture_dir", nargs="?", help="Target directory for 'record'")
+    parser.add_argument("--pairs", type=_csv(int), default=[1, 5, 50])
+    parser.add_argument("--days", type=_csv(int), default=[7, 30, 365])
+    parser.add_argument("--intervals", type=_csv(str), default=["1h", "1d", "1wk"])
+    parser.add_argument("--end", type=date.fromisoformat, default=date.today(), help="Last day of every range (recorded fixtures)")
+    parser.add_argument("--compare", help="Commit of a stored run to compare against")
+    parser.add_argument("--no-save", action="store_true")
+    parser.add_argument("--budget", type=_csv(str), default=[], help="Startup budget overrides, e.g. shell=0.1,imports=1.5 (seconds)")
+    args = parser.parse_args(argv)
+
+    if args.command == "record":
+        if not args.fixture_dir:
+            parser.error("record needs a fixture directory")
+        record_fixtures(args.fixture_dir, max(args.days), args.intervals, args.end)
+        return
+
+    if args.command == "_startup-child":
+        _startup_child()
+        return
+    if args.command == "startup":
+        budget = dict(STARTUP_BUDGET, **{k: float(v) for k, v in (item.split("=") for item in args.budget)})
+        sys.exit(0 if check_startup(budget) else 1)
+
+    results = run_grid(args.pairs, args.days, args.intervals, args.end)
+    if not args.no_save:
+        print(f"saved {save_results(results, current_commit())}")
+    if args.compare:
+        compare(results, args.compare)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,170 @@
+"""
+Rolling correlation of every pair's returns against every other pair.
+
+``RollingCorrelation`` keeps, over the last ``window`` bars of the aligned change % matrix
+(see ``stats.py``), the ``(pairs, pairs)`` sums behind a pairwise correlation: sum of products,
+sums and sums of squares over the bars both pairs printed, and their counts. The first
+``update`` fills them with four matrix products over the window; later updates add the outer
+product of each new bar and subtract the one of the bar leaving the window, O(pairs²) per bar
+in numpy, instead of recomputing ``DataFrame.rolling(window).corr()`` over the whole range.
+
+Pairs without a bar (NaN: before a pair's first bar, or a gap the aligned matrix forward-filled,
+see ``DashboardStats.observed_returns``) are left out pairwise, like ``DataFrame.corr()``. The last bar is still open, so, as in ``rolling.py``, it is never
+committed; ``matrix()`` folds it in on every read. The sums are recomputed from the window
+every ``window`` commits so rounding errors cannot build up.
+"""
+
+import threading
+
+import numpy as np
+
+# Bars in the correlation window (a day of hourly bars)
+DEFAULT_CORRELATION_WINDOW = 24
+
+
+def _split(returns):
+    """Zero-filled values and the float mask of the bars that are there."""
+    mask = ~np.isnan(returns)
+    return np.where(mask, returns, 0.0), mask.astype(float)
+
+
+def correlation(sxy, sx, sxx, count, min_periods):
+    """
+    Pairwise correlation from the window sums: ``sxy[i, j]`` sum of products, ``sx[i, j]``
+    sum of pair i over the bars pair j also has (``sxx`` of its squares), ``count[i, j]`` those bars.
+    """
+    return _correlation(sxy, sx, sx.T, sxx, sxx.T, count, min_periods)
+
+
+def _correlation(sxy, sx, sy, sxx, syy, count, min_periods):
+    with np.errstate(divide="ignore", invalid="ignore"):
+        cov = sxy - sx * sy / count
+        var_x = sxx - sx * sx / count
+        var_y = syy - sy * sy / count
+        # A flat series (or rounding noise around one) has no correlation
+        var_x = np.where(var_x > sxx * 1e-12, var_x, np.nan)
+        var_y = np.where(var_y > syy * 1e-12, var_y, np.nan)
+        corr = np.clip(cov / np.sqrt(var_x * var_y), -1.0, 1.0)
+    corr[count < min_periods] = np.nan
+    return corr
+
+
+class RollingCorrelation:
+    """``(pairs, pairs)`` correlation of the last ``window`` bars, updated as bars are appended."""
+
+    def __init__(self, window=DEFAULT_CORRELATION_WINDOW, min_periods=None):
+        self.window = window
+        self.min_periods = window if min_periods is None else min_periods
+        self._lock = threading.Lock()
+        self._reset(())
+
+    def _reset(self, pairs):
+        self.pairs = tuple(pairs)
+        self.first_time = None
+        self.last_time = None  # last committed bar
+        self.committed = 0
+        n = len(self.pairs)
+        # Ring of the committed bars inside the window, zero-filled values and masks
+        self._values = np.zeros((n, self.window))
+        self._mask = np.zeros((n, self.window))
+        self._position = 0  # ring column the next bar goes to
+        self._since_resum = 0
+        self._sums = [np.zeros((n, n)) for _ in range(4)]  # sxy, sx, sxx, count
+        self._last = np.full(n, np.nan)  # the open bar
+        self._returns = np.empty((n, 0))
+
+    def update(self, pairs, index, returns):
+        """
+        Bring the window up to date with the ``(pairs, bars)`` change % matrix on ``index``.
+
+        Bars after the last committed one are folded in; if the matrix no longer extends what was
+        committed (other pairs, another range, revised history) the window is rebuilt.
+        """
+        returns = np.asarray(returns, dtype=float)
+        with self._lock:
+            n = returns.shape[1]
+            extends = (tuple(pairs) == self.pairs and self.first_time is not None and n > self.committed
+                       and index[0] == self.first_time and index[self.committed - 1] == self.last_time)
+            if not extends:
+                self._rebuild(pairs, index, returns)
+            else:
+                for bar in range(self.committed, n - 1):
+                    self._push(returns[:, bar])
+                if n - 1 > self.committed:
+                    self.committed = n - 1
+                    self.last_time = index[n - 2]
+            self._last = returns[:, -1] if n else np.full(len(self.pairs), np.nan)
+            self._returns = returns
+        return self
+
+    def _rebuild(self, pairs, index, returns):
+        self._reset(pairs)
+        n = returns.shape[1]
+        if n < 2:
+            return
+        # The last ``window`` committed bars, in ring order
+        tail = returns[:, max(0, n - 1 - self.window):n - 1]
+        width = tail.shape[1]
+        self._values[:, :width], self._mask[:, :width] = _split(tail)
+        self._position = width % self.window
+        self._resum()
+        self.first_time, self.last_time, self.committed = index[0], index[n - 2], n - 1
+
+    def _resum(self):
+        # Four matrix products over the window: every pair against every pair at once
+        values, mask = self._values, self._mask
+        self._sums = [values @ values.T, values @ mask.T, (values * values) @ mask.T, mask @ mask.T]
+        self._since_resum = 0
+
+    def _push(self, returns):
+        values, mask = _split(returns)
+        old_values, old_mask = self._values[:, self._position].copy(), self._mask[:, self._position].copy()
+        sxy, sx, sxx, count = self._sums
+        # The ring starts zeroed, so while it fills the leaving column changes nothing
+        sxy += np.outer(values, values) - np.outer(old_values, old_values)
+        sx += np.outer(values, mask) - np.outer(old_values, old_mask)
+        sxx += np.outer(values * values, mask) - np.outer(old_values * old_values, old_mask)
+        count += np.outer(mask, mask) - np.outer(old_mask, old_mask)
+        self._values[:, self._position], self._mask[:, self._position] = values, mask
+        self._position = (self._position + 1) % self.window
+        self._since_resum += 1
+        if self._since_resum >= self.window:
+            self._resum()
+
+    # --- Reads, the open bar included ---
+    def matrix(self):
+        """``(pairs, pairs)`` correlation of the last ``window`` bars, NaN where two pairs share fewer than ``min_periods``."""
+        with self._lock:
+            values, mask = _split(self._last)
+            # Oldest committed bar, leaving the window (still zeros while it fills)
+            old_values, old_mask = self._values[:, self._position], self._mask[:, self._position]
+            sxy, sx, sxx, count = self._sums
+            return correlation(
+                sxy + np.outer(values, values) - np.outer(old_values, old_values),
+                sx + np.outer(values, mask) - np.outer(old_values, old_mask),
+                sxx + np.outer(values * values, mask) - np.outer(old_values * old_values, old_mask),
+                count + np.outer(mask, mask) - np.outer(old_mask, old_mask),
+                self.min_periods,
+            )
+
+    def history(self, pair):
+        """
+        ``(pairs, bars)`` rolling correlation of ``pair`` with every pair at every bar (what
+        ``rolling(window).corr()`` gives one column at a time), from running sums in one pass.
+        """
+        with self._lock:
+            returns, row = self._returns, self.pairs.index(pair)
+        values, mask = _split(returns)
+        x, x_mask = values[row], mask[row]
+
+        def windowed(series):
+            running = np.cumsum(np.concatenate([np.zeros((len(series), 1)), series], axis=1), axis=1)
+            running[:, self.window + 1:] -= running[:, 1:-self.window].copy()
+            return running[:, 1:]
+
+        # Sums over the bars both the pair and each other pair printed
+        sxy = windowed(values * x)
+        sx, sy = windowed(x * mask), windowed(values * x_mask)
+        sxx, syy = windowed(x * x * mask), windowed(values * values * x_mask)
+        count = windowed(mask * x_mask)
+        return _correlation(sxy, sx, sy, sxx, syy, count, self.min_periods)
@@ -0,0 +1,259 @@
+"""
+Data-access layer for the exchange rate dashboard.
+
+Providers expose a single ``history(ticker, start, end, interval, period)`` method that
+returns a yfinance-style OHLC DataFrame (Open, High, Low, Close, Volume, Dividends,
+Stock Splits). ``fetch_all`` fans the per-ticker calls out over a bounded thread pool so a
+cold render waits for the slowest pair instead of the sum of all pairs.
+"""
+
+import json
+import os
+import time
+import zlib
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date
+
+import numpy as np
+import pandas as pd
+
+# Number of upstream requests allowed in flight at once
+DEFAULT_MAX_WORKERS = 8
+
+# Columns returned by yf.Ticker(...).history(...)
+OHLC_COLUMNS = ["Open", "High", "Low", "Close", "Volume", "Dividends", "Stock Splits"]
+
+
+# --- FX trading calendar ---
+# FX trades around the clock from Sunday evening to Friday evening; Saturdays and the two days
+# nearly every venue is shut have no bars at all
+FX_CLOSED_DAYS = ((1, 1), (12, 25))  # (month, day)
+
+
+def market_closed(start, end):
+    """True when no day of ``[start, end)`` trades (or the range has not begun yet), so an empty answer is expected."""
+    if start is None or end is None:
+        return False
+    days = pd.date_range(pd.Timestamp(str(start)[:10]), pd.Timestamp(str(end)[:10]), inclusive="left")
+    if not len(days):
+        return False
+    closed = (days.weekday == 5) | pd.Index(zip(days.month, days.day)).isin(FX_CLOSED_DAYS) | (days.date > date.today())
+    return bool(closed.all())
+
+
+# --- Yahoo Finance ---
+class YahooProvider:
+    name = "yahoo"
+
+    def history(self, ticker, start=None, end=None, interval="1h", period=None):
+        import yfinance as yf  # Imported here so offline providers never need yfinance
+
+        if period is not None:
+            return yf.Ticker(ticker).history(period=period, interval=interval)
+        return yf.Ticker(ticker).history(start=start, end=end, interval=interval)
+
+
+# --- Local fake provider (tests / benchmarks) ---
+# Rough THB levels so synthetic charts look like the real ones
+_BASE_RATES = {
+    "EURTHB=X": 37.0,
+    "JPYTHB=X": 0.23,
+    "GBPTHB=X": 43.0,
+    "AUDTHB=X": 22.0,
+    "USDTHB=X": 34.0,
+    "CNYTHB=X": 4.7,
+}
+
+_BAR_STEP = {"1h": "60min", "1d": "1D", "1wk": "7D"}
+_PERIOD_DAYS = {"1d": 1, "5d": 5, "1mo": 30, "3mo": 90, "6mo": 180, "1y": 365}
+
+
+class FakeProvider:
+    """Deterministic synthetic bars with an optional injected per-request latency."""
+
+    name = "fake"
+
+    def __init__(self, latency=0.0, tz="Europe/London"):
+        self.latency = latency
+        self.tz = tz
+        self.calls = 0
+        self.bars_served = 0
+
+    def history(self, ticker, start=None, end=None, interval="1h", period=None):
+        self.calls += 1
+        if self.latency:
+            time.sleep(self.latency)
+
+        if period is not None:
+            end = pd.Timestamp.now(tz=self.tz).floor("D") + pd.Timedelta(days=1)
+            start = end - pd.Timedelta(days=_PERIOD_DAYS.get(period, 1))
+        start, end = _to_timestamp(start, self.tz), _to_timestamp(end, self.tz)
+        index = pd.date_range(start, max(start, end), freq=_BAR_STEP.get(interval, "60min"), inclusive="left", name="Datetime")
+        index = index[index < end]
+        self.bars_served += len(index)
+        return synthetic_bars(ticker, index)
+
+
+def synthetic_bars(ticker, index):
+    # Bars are derived from the timestamps themselves, so overlapping requests agree
+    n = len(index)
+    base = _BASE_RATES.get(ticker, 10.0)
+    seed = zlib.crc32(ticker.encode())
+    # Hours since the epoch, independent of the index's datetime resolution
+    steps = np.asarray((index - pd.Timestamp(0, tz=index.tz)) // pd.Timedelta(hours=1), dtype=np.int64)
+    # Smooth, bounded drift keyed on the hour number keeps the walk stable across ranges
+    close = base * (1 + 0.02 * np.sin(steps / 97.0 + seed % 17) + 0.005 * np.sin(steps / 7.0 + seed % 5))
+    noise = (np.sin(steps * 12.9898 + seed) * 43758.5453) % 1.0
+    spread = base * 0.001 * (0.5 + noise)
+    open_ = np.roll(close, 1)
+    if n:
+        open_[0] = close[0]
+
+    return pd.DataFrame(
+        {
+            "Open": open_,
+            "High": np.maximum(open_, close) + spread,
+            "Low": np.minimum(open_, close) - spread,
+            "Close": close,
+            "Volume": np.zeros(n, dtype=np.int64),
+            "Dividends": np.zeros(n),
+            "Stock Splits": np.zeros(n),
+        },
+        index=index,
+    )
+
+
+def _to_timestamp(value, tz):
+    ts = pd.Timestamp(value)
+    return ts.tz_localize(tz) if ts.tzinfo is None else ts.tz_convert(tz)
+
+
+# --- Recorded fixtures (benchmarks) ---
+def recorded_path(root, ticker, interval):
+    safe = "".join(c if c.isalnum() else "_" for c in ticker)
+    return os.path.join(root, interval, f"{safe}.csv")
+
+
+class RecordedProvider:
+    """Replays bars saved as ``root/<interval>/<ticker>.csv`` (see ``bench_dashboard.py record``)."""
+
+    name = "recorded"
+
+    def __init__(self, root):
+        self.root = root
+        self.calls = 0
+        self._frames = {}
+
+    def history(self, ticker, start=None, end=None, interval="1h", period=None):
+        self.calls += 1
+        bars = self._load(ticker, interval)
+        if bars.empty:
+            return bars
+        if period is not None:
+            end = bars.index[-1].floor("D") + pd.Timedelta(days=1)
+            start = end - pd.Timedelta(days=_PERIOD_DAYS.get(period, 1))
+        start, end = _to_timestamp(start, bars.index.tz), _to_timestamp(end, bars.index.tz)
+        return bars[(bars.index >= start) & (bars.index < end)]
+
+    def _load(self, ticker, interval):
+        key = (ticker, interval)
+        if key not in self._frames:
+            path = recorded_path(self.root, ticker, interval)
+            if os.path.exists(path):
+                bars = pd.read_csv(path, index_col=0)
+                # Offsets change with DST, so parse as UTC rather than a fixed-offset zone
+                bars.index = pd.DatetimeIndex(pd.to_datetime(bars.index, utc=True), name="Datetime")
+            else:
+                bars = pd.DataFrame(columns=OHLC_COLUMNS)
+            self._frames[key] = bars
+        return self._frames[key]
+
+
+# --- HTTP quote server (fake_server.py, or anything speaking its JSON) ---
+class HttpProvider:
+    """Bars from ``GET <base_url>/history?ticker=&start=&end=&interval=&period=``."""
+
+    name = "http"
+
+    def __init__(self, base_url, timeout=30.0):
+        self.base_url = base_url.rstrip("/")
+        self.timeout = timeout
+
+    def history(self, ticker, start=None, end=None, interval="1h", period=None):
+        from urllib.parse import urlencode
+        from urllib.request import urlopen
+
+        query = {"ticker": ticker, "interval": interval}
+        query.update({k: str(v) for k, v in (("start", start), ("end", end), ("period", period)) if v is not None})
+        with urlopen(f"{self.base_url}/history?{urlencode(query)}", timeout=self.timeout) as response:
+            return bars_from_json(response.read())
+
+
+def bars_to_json(bars):
+    index = pd.DatetimeIndex(bars.index)
+    return json.dumps({
+        "tz": str(index.tz or "UTC"),
+        "times": index.as_unit("ns").asi8.tolist(),
+        "columns": list(bars.columns),
+        "values": bars.to_numpy(dtype=float).tolist(),
+    })
+
+
+def bars_from_json(payload):
+    data = json.loads(payload)
+    index = pd.DatetimeIndex(pd.to_datetime(data["times"], unit="ns", utc=True), name="Datetime").tz_convert(data["tz"])
+    return pd.DataFrame(np.asarray(data["values"], dtype=float).reshape(-1, len(data["columns"])), index=index, columns=data["columns"])
+
+
+# --- Provider selection ---
+def get_provider(name=None, **kwargs):
+    # EXCHANGE_PROVIDER=fake lets the dashboard run offline against synthetic bars
+    name = name or os.environ.get("EXCHANGE_PROVIDER", "yahoo")
+    if name == "fake":
+        latency = float(os.environ.get("EXCHANGE_FAKE_LATENCY", "0"))
+        return FakeProvider(latency=kwargs.get("latency", latency))
+    if name == "recorded":
+        return RecordedProvider(kwargs.get("root") or os.environ.get("EXCHANGE_FIXTURE_DIR", "fixtures"))
+    if name == "http":
+        return HttpProvider(kwargs.get("url") or os.environ.get("EXCHANGE_HTTP_URL", "http://127.0.0.1:8765"))
+    if name == "yahoo":
+        return YahooProvider()
+    raise ValueError(f"Unknown exchange data provider: {name}")
+
+
+def build_provider(client=None):
+    """
+    The dashboard's provider stack over ``client`` (a ``FetchClient`` around ``get_provider()``
+    by default), shared by main.py and snapshot_api.py.
+    """
+    # The layers import this module, so they are imported here rather than at the top
+    from archive import Archive, ArchiveProvider
+    from bar_store import BarStore
+    from fetch_client import FetchClient
+    from pyramid import ResampledProvider
+
+    provider = BarStore(client or FetchClient(get_provider()))  # Bars persist on disk; while upstream fails, the stored ones are served
+    archive = Archive()
+    if os.path.isdir(archive.root):
+        provider = ArchiveProvider(provider, archive)  # Multi-year dumps imported with archive.py, memory-mapped
+    return ResampledProvider(provider)  # Only 1h bars are downloaded, 1d/1wk are resampled from them locally
+
+
+# --- Batched fetch ---
+def fetch_all(provider, tickers, start=None, end=None, interval="1h", period=None, max_workers=DEFAULT_MAX_WORKERS):
+    """Fetch every ticker concurrently and return ``{ticker: DataFrame}`` in input order."""
+    tickers = list(dict.fromkeys(tickers))
+    if not tickers:
+        return {}
+
+    def fetch_one(ticker):
+        try:
+            return provider.history(ticker, start=start, end=end, interval=interval, period=period)
+        except Exception:
+            # Same behaviour as a failed yfinance call: the panel shows "No data available"
+            return pd.DataFrame(columns=OHLC_COLUMNS)
+
+    workers = max(1, min(max_workers, len(tickers)))
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        frames = list(pool.map(fetch_one, tickers))
+    return dict(zip(tickers, frames))
@@ -0,0 +1,85 @@
+"""
+Server-side downsampling of long series before they are handed to ``st_echarts``.
+
+Line/area/bar style panels use Largest-Triangle-Three-Buckets (LTTB) to pick the visually
+significant bars, candlesticks are merged into OHLC buckets. Both keep the series' max and
+min so the ``markPoint`` markers and y-axis ranges stay correct.
+"""
+
+import numpy as np
+
+# Points sent per chart unless the sidebar asks for something else
+DEFAULT_POINT_BUDGET = 1500
+
+
+def lttb_indices(values, budget=DEFAULT_POINT_BUDGET):
+    """Positions of the ``budget`` points LTTB keeps from ``values`` (always includes both ends)."""
+    y = np.asarray(values, dtype=float)
+    n = len(y)
+    if budget < 3 or n <= budget:
+        return np.arange(n)
+
+    # budget - 2 buckets for the inner points, first and last point are always kept
+    edges = np.linspace(1, n - 1, budget - 1).astype(np.int64)
+    # Average point of every bucket in one pass; the last bucket looks ahead to the final point
+    filled = np.where(np.isnan(y), np.nanmean(y) if not np.isnan(y).all() else 0.0, y)
+    sizes = np.diff(edges)
+    avg_x = np.append((np.add.reduceat(np.arange(n - 1, dtype=float)[:edges[-1]], edges[:-1]) / sizes)[1:], n - 1)
+    avg_y = np.append((np.add.reduceat(filled[:edges[-1]], edges[:-1]) / sizes)[1:], filled[-1])
+
+    # The triangle's first vertex is the previous pick, so this part is inherently sequential.
+    # Buckets hold only a handful of points, where plain Python beats per-bucket numpy calls.
+    ys = filled.tolist()
+    bounds = edges.tolist()
+    look_x, look_y = avg_x.tolist(), avg_y.tolist()
+    selected = [0]
+    a = 0
+    for i in range(budget - 2):
+        ax, ay, cx, cy = a, ys[a], look_x[i], look_y[i]
+        best, best_area = bounds[i], -1.0
+        for j in range(bounds[i], bounds[i + 1]):
+            area = abs((ax - cx) * (ys[j] - ay) - (ax - j) * (cy - ay))
+            if area > best_area:
+                best, best_area = j, area
+        a = best
+        selected.append(a)
+    selected.append(n - 1)
+    return np.asarray(selected, dtype=np.int64)
+
+
+def keep_extremes(indices, values):
+    """Add the positions of the global max and min of ``values`` to ``indices``."""
+    y = np.asarray(values, dtype=float)
+    if len(y) == 0 or np.isnan(y).all():
+        return np.asarray(indices)
+    return np.union1d(indices, [np.nanargmax(y), np.nanargmin(y)])
+
+
+def downsample_indices(values, budget=DEFAULT_POINT_BUDGET):
+    """LTTB positions plus the max/min bars, sorted - what line, area, bar and scatter panels send."""
+    return keep_extremes(lttb_indices(values, budget), values)
+
+
+def ohlc_buckets(open_, high, low, close, budget=DEFAULT_POINT_BUDGET):
+    """
+    Merge consecutive bars into at most ``budget`` OHLC buckets.
+
+    Returns ``(starts, ohlc)`` where ``starts`` are the positions of each bucket's first bar
+    (used for the axis label) and ``ohlc`` is an ``(n_buckets, 4)`` array in the ECharts
+    candlestick order ``[open, close, lowest, highest]``.
+    """
+    open_, high, low, close = (np.asarray(v, dtype=float) for v in (open_, high, low, close))
+    n = len(close)
+    if n <= budget or budget < 1:
+        return np.arange(n), np.column_stack([open_, close, low, high])
+
+    size = -(-n // budget)  # ceil division keeps the bucket count within budget
+    starts = np.arange(0, n, size)
+    ends = np.minimum(starts + size, n) - 1
+    ohlc = np.column_stack([
+        open_[starts],
+        close[ends],
+        np.fmin.reduceat(low, starts),
+        np.fmax.reduceat(high, starts),
+    ])
+    return starts, ohlc
@@ -0,0 +1,126 @@
+"""
+Local HTTP quote server with injected faults, for exercising the fetch client offline.
+
+Serves ``FakeProvider`` bars at ``/history?ticker=&start=&end=&interval=&period=`` in the JSON
+``HttpProvider`` reads. A ``FaultPlan`` makes a share of the requests slow, fail with HTTP 500
+or hang, drawn from a seeded generator so runs are reproducible::
+
+    python fake_server.py --port 8765 --failure-rate 0.1 --slow-rate 0.05 --slow-latency 3
+    EXCHANGE_PROVIDER=http EXCHANGE_HTTP_URL=http://127.0.0.1:8765 streamlit run main.py
+"""
+
+import argparse
+import random
+import threading
+import time
+from dataclasses import dataclass, replace
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+from data_provider import FakeProvider, bars_to_json
+
+
+@dataclass(frozen=True)
+class FaultPlan:
+    latency: float = 0.0  # seconds every request takes
+    slow_rate: float = 0.0  # share of requests taking slow_latency instead
+    slow_latency: float = 1.0
+    failure_rate: float = 0.0  # share answered with HTTP 500
+    hang_rate: float = 0.0  # share that only answers after hang_seconds
+    hang_seconds: float = 60.0
+    down: bool = False  # every request fails
+
+
+class FakeQuoteServer:
+    def __init__(self, faults=FaultPlan(), host="127.0.0.1", port=0, seed=0):
+        self.faults = faults
+        self.requests = 0
+        self.provider = FakeProvider()
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+        self._server = ThreadingHTTPServer((host, port), self._handler())
+        self._server.daemon_threads = True
+        self._thread = None
+
+    @property
+    def url(self):
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def inject(self, **changes):
+        """Change the fault plan of a running server, e.g. ``inject(down=True)``."""
+        self.faults = replace(self.faults, **changes)
+
+    def start(self):
+        self._thread = threading.Thread(target=self._server.serve_forever, name="fake-quote-server", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._server.shutdown()
+        self._server.server_close()
+
+    def _fault(self):
+        with self._lock:
+            self.requests += 1
+            draw = self._random.random()
+        faults = self.faults
+        if faults.down or draw < faults.failure_rate:
+            return "fail", faults.latency
+        draw -= faults.failure_rate
+        if draw < faults.hang_rate:
+            return "ok", faults.hang_seconds
+        draw -= faults.hang_rate
+        return "ok", faults.slow_latency if draw < faults.slow_rate else faults.latency
+
+    def _handler(self):
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                url = urlparse(self.path)
+                if url.path != "/history":
+                    self.send_error(404)
+                    return
+                outcome, delay = server._fault()
+                if delay:
+                    time.sleep(delay)
+                if outcome == "fail":
+                    self.send_error(500, "Injected failure")
+                    return
+                query = {k: v[0] for k, v in parse_qs(url.query).items()}
+                bars = server.provider.history(query["ticker"], start=query.get("start"), end=query.get("end"),
+                                               interval=query.get("interval", "1h"), period=query.get("period"))
+                body = bars_to_json(bars).encode()
+                self.send_response(200)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                pass  # One line per request would drown the benchmark output
+
+        return Handler
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--seed", type=int, default=0)
+    for field, default in FaultPlan.__dataclass_fields__.items():
+        if field != "down":
+            parser.add_argument(f"--{field.replace('_', '-')}", type=float, default=default.default)
+    args = parser.parse_args(argv)
+    faults = FaultPlan(**{field: getattr(args, field) for field in FaultPlan.__dataclass_fields__ if field != "down"})
+    server = FakeQuoteServer(faults, args.host, args.port, args.seed)
+    print(f"Serving fake quotes on {server.url} with {faults}")
+    try:
+        server._server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,180 @@
+"""
+Upstream fetch client: deadlines, jittered retries, hedged requests and a circuit breaker.
+
+``FetchClient`` wraps a provider (usually the Yahoo one) and implements the same ``history``
+interface, so it slots in under the ``BarStore``:
+
+* every request has a deadline (``EXCHANGE_FETCH_DEADLINE`` seconds, retries included); a call
+  that hangs is abandoned in its worker thread instead of blocking the script run;
+* failed attempts are retried with full-jitter exponential backoff (``EXCHANGE_FETCH_RETRIES``),
+  empty answers too, since Yahoo reports most errors as an empty frame. Only an empty weekend or
+  holiday (``market_closed``) is a real answer, returned at once; a range that trades and stays
+  empty on every attempt fails like any other error;
+* with ``EXCHANGE_FETCH_HEDGE_AFTER`` set, an attempt that has not answered after that many
+  seconds gets a duplicate request and the first answer wins, which cuts the tail latency;
+* a circuit breaker per client opens after ``BREAKER_THRESHOLD`` failed requests in a row and
+  fails fast for ``BREAKER_RESET`` seconds, then lets one trial request through. Failures
+  raise ``FetchError``; the ``BarStore`` and the refresher keep serving the last good bars.
+
+Latencies of successful requests are kept for p50/p99 reporting (debug sidebar, benchmarks).
+"""
+
+import os
+import random
+import threading
+import time
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+
+import numpy as np
+
+from data_provider import market_closed
+
+DEFAULT_DEADLINE = float(os.environ.get("EXCHANGE_FETCH_DEADLINE", "20"))
+DEFAULT_RETRIES = int(os.environ.get("EXCHANGE_FETCH_RETRIES", "2"))
+# Seconds before a slow attempt is duplicated; None turns hedging off
+_hedge = os.environ.get("EXCHANGE_FETCH_HEDGE_AFTER", "")
+DEFAULT_HEDGE_AFTER = float(_hedge) if _hedge else None
+# First retry waits up to this long, doubling per attempt (full jitter)
+BACKOFF_BASE = 0.25
+BREAKER_THRESHOLD = 5
+BREAKER_RESET = 30.0
+# Request latencies kept for the percentiles
+LATENCY_WINDOW = 1000
+
+
+class FetchError(Exception):
+    pass
+
+
+class CircuitOpenError(FetchError):
+    pass
+
+
+class CircuitBreaker:
+    """closed -> open after ``threshold`` consecutive failures -> half-open after ``reset_after`` seconds."""
+
+    def __init__(self, threshold=BREAKER_THRESHOLD, reset_after=BREAKER_RESET, clock=time.monotonic):
+        self.threshold = threshold
+        self.reset_after = reset_after
+        self.clock = clock
+        self.failures = 0
+        self.opened_at = None
+        self._trial = False  # a half-open trial request is in flight
+        self._lock = threading.Lock()
+
+    @property
+    def state(self):
+        if self.opened_at is None:
+            return "closed"
+        return "half-open" if self.clock() - self.opened_at >= self.reset_after else "open"
+
+    def allow(self):
+        with self._lock:
+            state = self.state
+            if state == "closed":
+                return True
+            if state == "half-open" and not self._trial:
+                self._trial = True
+                return True
+            return False
+
+    def success(self):
+        with self._lock:
+            self.failures, self.opened_at, self._trial = 0, None, False
+
+    def failure(self):
+        with self._lock:
+            self.failures += 1
+            if self._trial or self.failures >= self.threshold:
+                self.opened_at, self._trial = self.clock(), False
+
+
+class FetchClient:
+    def __init__(self, provider, deadline=DEFAULT_DEADLINE, retries=DEFAULT_RETRIES, hedge_after=DEFAULT_HEDGE_AFTER,
+                 breaker=None, max_workers=16, seed=None):
+        self.provider = provider
+        self.deadline = deadline
+        self.retries = retries
+        self.hedge_after = hedge_after
+        self.breaker = breaker or CircuitBreaker()
+        self.name = f"client:{getattr(provider, 'name', 'provider')}"
+        self.attempts = 0
+        self.hedges = 0
+        self.failures = 0
+        self._latencies = deque(maxlen=LATENCY_WINDOW)
+        self._random = random.Random(seed)
+        # Abandoned (timed out) calls keep their worker until they return, so the pool is generous
+        self._pool = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="exchange-fetch")
+
+    # --- Provider interface ---
+    def history(self, ticker, start=None, end=None, interval="1h", period=None):
+        if not self.breaker.allow():
+            raise CircuitOpenError(f"{self.name}: circuit open, not fetching {ticker}")
+        kwargs = {"start": start, "end": end, "interval": interval, "period": period}
+        expect_bars = period is not None or not market_closed(start, end)
+        started = time.monotonic()
+        deadline_at = started + self.deadline
+        error = None
+        for attempt in range(self.retries + 1):
+            remaining = deadline_at - time.monotonic()
+            if remaining <= 0:
+                error = error or TimeoutError(f"{ticker}: deadline of {self.deadline}s exceeded")
+                break
+            try:
+                frame = self._attempt(ticker, kwargs, remaining)
+            except Exception as exc:  # Timeout or upstream error, both retried
+                error = exc
+            else:
+                if not frame.empty or not expect_bars:
+                    self.breaker.success()
+                    self._latencies.append(time.monotonic() - started)
+                    return frame
+                # Empty for a range that trades: Yahoo's usual way of failing, retried
+            if attempt < self.retries:
+                delay = self._random.uniform(0, BACKOFF_BASE * 2 ** attempt)
+                time.sleep(max(0.0, min(delay, deadline_at - time.monotonic())))
+
+        if error is None:
+            # Empty on every attempt for a range that trades: rate limited or down, not an answer
+            error = ValueError(f"no bars for {start}..{end} after {self.retries + 1} attempts")
+        self.failures += 1
+        self.breaker.failure()
+        raise FetchError(f"{ticker}: {error}") from error
+
+    def _attempt(self, ticker, kwargs, timeout):
+        """One attempt, duplicated after ``hedge_after`` seconds; the first successful answer wins."""
+        self.attempts += 1
+        pending = {self._pool.submit(self.provider.history, ticker, **kwargs)}
+        attempt_deadline = time.monotonic() + timeout
+        hedged = self.hedge_after is None or self.hedge_after >= timeout
+        error = None
+        while pending:
+            wait_for = attempt_deadline - time.monotonic()
+            if not hedged:
+                wait_for = min(wait_for, self.hedge_after)
+            if wait_for <= 0:
+                break
+            done, pending = wait(pending, timeout=wait_for, return_when=FIRST_COMPLETED)
+            for future in done:
+                if future.exception() is None:
+                    return future.result()
+                error = future.exception()
+            if not hedged and not done:
+                self.hedges += 1
+                pending.add(self._pool.submit(self.provider.history, ticker, **kwargs))
+            hedged = True
+        if error is not None and not pending:
+            raise error
+        raise TimeoutError(f"{ticker}: no answer within {timeout:.1f}s")
+
+    # --- Reporting ---
+    def latency(self, percentiles=(50, 99)):
+        """``{percentile: seconds}`` over the last successful requests, empty before the first one."""
+        latencies = list(self._latencies)
+        if not latencies:
+            return {}
+        return dict(zip(percentiles, (float(v) for v in np.percentile(latencies, percentiles))))
+
+    def close(self):
+        self._pool.shutdown(wait=False, cancel_futures=True)
@@ -0,0 +1,147 @@
+"""
+Per-section instrumentation of dashboard reruns.
+
+``main.py`` wraps every panel in ``metrics.section(name, rows)``. A section records its wall
+time, the rows it processed and the JSON size of the charts it sent. The records of the
+current rerun feed the optional debug sidebar (``?debug=1`` or ``EXCHANGE_DEBUG=1``). They
+are also added to process-wide totals that can be exported in the Prometheus text format
+(``EXCHANGE_METRICS_FILE``, for node_exporter's textfile collector) and logged as one JSON
+line per section (``EXCHANGE_METRICS_LOG=1``).
+"""
+
+import cProfile
+import io
+import json
+import logging
+import os
+import pstats
+import threading
+import time
+from contextlib import contextmanager
+from dataclasses import asdict, dataclass
+
+logger = logging.getLogger("exchange_dashboard.metrics")
+
+DEBUG = os.environ.get("EXCHANGE_DEBUG") == "1"
+METRICS_FILE = os.environ.get("EXCHANGE_METRICS_FILE")
+if os.environ.get("EXCHANGE_METRICS_LOG") == "1" and not logger.handlers:
+    _handler = logging.StreamHandler()
+    _handler.setFormatter(logging.Formatter("%(message)s"))
+    logger.addHandler(_handler)
+    logger.setLevel(logging.INFO)
+
+# Functions listed in a profile report
+PROFILE_LINES = 40
+
+
+@dataclass
+class SectionMetrics:
+    section: str
+    seconds: float = 0.0
+    rows: int = 0
+    charts: int = 0
+    payload_bytes: int = 0  # only measured when something reads it (debug sidebar, exports)
+
+
+class RerunMetrics:
+    """Sections of one script run. Fragment reruns replace the records of their own sections."""
+
+    def __init__(self, measure_payload=False):
+        self.measure_payload = measure_payload
+        self.sections = {}  # name -> SectionMetrics, in page order
+        self._open = []
+
+    @contextmanager
+    def section(self, name, rows=0):
+        record = SectionMetrics(name, rows=rows)
+        self._open.append(record)
+        start = time.perf_counter()
+        try:
+            yield record  # rows can still be set on the record once they are known
+        finally:
+            record.seconds = time.perf_counter() - start
+            self._open.pop()
+            self.sections[name] = record
+            REGISTRY.observe(record)
+            if logger.isEnabledFor(logging.INFO):
+                logger.info(json.dumps({"event": "dashboard_section", **asdict(record)}))
+
+    def chart(self, render):
+        """Wrap ``st_echarts`` so every chart is counted against the innermost open section."""
+        def instrumented(options, *args, **kwargs):
+            if self._open:
+                record = self._open[-1]
+                record.charts += 1
+                if self.measure_payload:
+                    record.payload_bytes += len(json.dumps(options, default=str))
+            return render(options, *args, **kwargs)
+        return instrumented
+
+    def table(self):
+        return [asdict(record) for record in self.sections.values()]
+
+
+def exporting():
+    """True when section metrics leave the process (Prometheus file or JSON logs)."""
+    return bool(METRICS_FILE) or logger.isEnabledFor(logging.INFO)
+
+
+# --- Process-wide totals ---
+class MetricsRegistry:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._totals = {}  # section -> [reruns, seconds, rows, payload bytes]
+
+    def observe(self, record):
+        with self._lock:
+            totals = self._totals.setdefault(record.section, [0, 0.0, 0, 0])
+            totals[0] += 1
+            totals[1] += record.seconds
+            totals[2] += record.rows
+            totals[3] += record.payload_bytes
+
+    def totals(self):
+        """``{section: {"reruns", "seconds", "rows", "payload_bytes"}}`` observed so far."""
+        with self._lock:
+            return {name: dict(zip(("reruns", "seconds", "rows", "payload_bytes"), values)) for name, values in self._totals.items()}
+
+    def prometheus_text(self):
+        with self._lock:
+            totals = {name: list(values) for name, values in self._totals.items()}
+        lines = [
+            "# HELP dashboard_section_seconds Wall time spent rendering a dashboard section.",
+            "# TYPE dashboard_section_seconds summary",
+        ]
+        for name, (count, seconds, _, _) in totals.items():
+            lines.append(f'dashboard_section_seconds_sum{{section="{name}"}} {seconds:.6f}')
+            lines.append(f'dashboard_section_seconds_count{{section="{name}"}} {count}')
+        for metric, position, description in (("rows", 2, "Rows processed"), ("payload_bytes", 3, "Chart JSON bytes sent")):
+            lines.append(f"# HELP dashboard_section_{metric}_total {description} by a dashboard section.")
+            lines.append(f"# TYPE dashboard_section_{metric}_total counter")
+            for name, values in totals.items():
+                lines.append(f'dashboard_section_{metric}_total{{section="{name}"}} {values[position]}')
+        return "\n".join(lines) + "\n"
+
+    def write_prometheus(self, path):
+        # Write-then-rename so the collector never scrapes a half-written file
+        with open(path + ".tmp", "w") as f:
+            f.write(self.prometheus_text())
+        os.replace(path + ".tmp", path)
+
+
+REGISTRY = MetricsRegistry()
+
+
+# --- Profiling ---
+def start_profile():
+    profiler = cProfile.Profile()
+    profiler.enable()
+    return profiler
+
+
+def stop_profile(profiler, lines=PROFILE_LINES):
+    """Stop ``profiler`` and return its hottest functions by cumulative time as text."""
+    profiler.disable()
+    out = io.StringIO()
+    pstats.Stats(profiler, stream=out).sort_stats("cumulative").print_stats(lines)
+    return out.getvalue()
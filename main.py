@@ -55,372 +55,783 @@
 ---
 """
 
-import yfinance as yf
 import streamlit as st
-import pandas as pd
+import os
+import time
 from datetime import date, timedelta
-from streamlit_echarts import st_echarts
-
-st.set_page_config(layout="wide", page_title="Exchange Rate Statistics", page_icon="📈")
+from instrumentation import DEBUG, METRICS_FILE, REGISTRY, RerunMetrics, exporting, start_profile, stop_profile
+
+# --- Instrumentation ---
+# Wall time, rows and chart payload of every section; ?debug=1 adds the numbers to the sidebar
+debug_mode = DEBUG or st.query_params.get("debug") == "1"
+metrics = RerunMetrics(measure_payload=debug_mode or exporting())
+
+# --- Page Shell ---
+# Only streamlit and the standard library so far: on a cold worker the title and sidebar are on
+# screen before pandas/numpy and the data layer are imported and before the first fetch
+with metrics.section("shell"):
+    st.set_page_config(layout="wide", page_title="Exchange Rate Statistics", page_icon="📈")
+    st.title("📊 Exchange Rate Statistics")
+    st.write("Explore key statistics for major currency exchange rates.")
+
+    # --- Sidebar ---
+    st.sidebar.header("Date Range Selection")
+    today = date.today()
+    start_date = st.sidebar.date_input("Start date", today - timedelta(days=7))  # Reduced default range to 7 days
+    end_date = st.sidebar.date_input("End date", today)
+
+    # Add interval selection
+    interval_options = ["1h", "1d", "1wk"]  # Reduced to 3 options
+    selected_interval = st.sidebar.selectbox("Select Interval", interval_options, index=0)  # Default to 1h
+
+    profiler = None
+    if debug_mode and st.sidebar.button("Profile this rerun"):
+        profiler = start_profile()  # cProfile of everything below, shown in the debug sidebar
+
+# --- Heavy Imports ---
+# Paid once per worker process (later reruns find them in sys.modules); yfinance is only imported by
+# the Yahoo provider on its first request, streamlit_echarts with the first chart
+with metrics.section("imports"):
+    import pandas as pd
+    import numpy as np
+    from data_provider import build_provider, get_provider
+    from fetch_client import FetchClient
+    from refresher import BackgroundRefresher
+    from compact import DEFAULT_BAR_DTYPE
+    from rolling import DEFAULT_WINDOWS, RollingStats
+    from correlation import DEFAULT_CORRELATION_WINDOW, RollingCorrelation
+    from stats import WEEKDAYS, compute_stats, heatmap_cells, hour_weekday_means, radar_chart_data, value_bounds
+    from downsample import DEFAULT_POINT_BUDGET, downsample_indices, ohlc_buckets
+    from payload import CHANGE_DIGITS, axis_labels, axis_times, dataset
+    from universe import load_universe
+    from streaming import DEFAULT_REFRESH, TickHub, live_bars, start_feed, stream_mode
+
+def st_echarts(options, **kwargs):
+    from streamlit_echarts import st_echarts as render  # Loaded with the first chart, after the shell is up
+    return render(options, **kwargs)
+
+st_echarts = metrics.chart(st_echarts)
 
 # --- Data Fetching ---
-@st.cache_data
-def get_exchange_data(ticker, start_date, end_date, interval="1h"):  # Added interval parameter
-    data = yf.Ticker(ticker)
-    hist = data.history(start=start_date, end=end_date, interval=interval)  # Added interval to history
-    return hist
+@st.cache_resource
+def get_fetch_client():
+    # Deadlines, retries, optional hedging and a circuit breaker around upstream (see fetch_client.py)
+    return FetchClient(get_provider())  # Yahoo by default, EXCHANGE_PROVIDER=fake for offline runs
+
+@st.cache_resource
+def get_data_provider():
+    # Built on first use and shared by every session: bar store, archive and resample pyramid over
+    # the fetch client (data_provider.build_provider), the same stack snapshot_api.py serves from
+    return build_provider(get_fetch_client())
+
+@st.cache_resource
+def get_refresher():
+    # One background poll loop per server process, shared by every session
+    return BackgroundRefresher(get_data_provider(), dtype=DEFAULT_BAR_DTYPE).start()  # Snapshots hold compact read-only OHLC bars
+
+def get_all_exchange_data(tickers, start_date, end_date, interval="1h"):
+    # Stale-while-revalidate: only the first request for a window waits on upstream, every pair in one concurrent round
+    return get_refresher().get(tickers, start_date, end_date, interval=interval)
+
+@st.cache_resource
+def get_tick_hub(tickers):
+    # EXCHANGE_STREAM=replay|yahoo: one feed per server process fills a ring buffer per pair for every session
+    return start_feed(TickHub(), tickers, get_data_provider())
+
+@st.cache_resource(max_entries=16)
+def get_triangulator(tickers, start_date, end_date, interval, version, cross_mode, _universe, _frames):
+    # One per snapshot version; the crosses it derives are cached inside and shared by every session
+    return _universe.triangulator(_frames)
+
+@st.cache_resource(max_entries=512)
+def get_rolling_stats(pair, start_date, end_date, interval, live=False):
+    # Kept across data refreshes: each refresh (or streamed tick with live=True) only folds in the new bars
+    return RollingStats()
+
+def update_rolling_stats(pair, data, live=False):
+    return get_rolling_stats(pair, start_date, end_date, selected_interval, live).update(data.index, data['Close'].to_numpy())
+
+@st.cache_resource(max_entries=64)
+def get_correlation(pairs, start_date, end_date, interval, window):
+    # Kept across data refreshes like the rolling stats; every session reads the same window sums
+    return RollingCorrelation(window)
+
+@st.cache_resource(max_entries=16)
+def get_dashboard_stats(pair_names, start_date, end_date, interval, version, _exchange_data, _rolling=None):
+    # Computed once per data refresh (snapshot version) and shared read-only by every session, every panel below reads from this result
+    return compute_stats(_exchange_data, rolling=_rolling)
 
 # --- Currency Data ---
-currencies = {
-    "EUR/THB": "EURTHB=X",
-    "JPY/THB": "JPYTHB=X",
-    "GBP/THB": "GBPTHB=X",
-    "AUD/THB": "AUDTHB=X",
-    "USD/THB": "USDTHB=X"
-}
-
-# --- Sidebar ---
-st.sidebar.header("Date Range Selection")
-today = date.today()
-start_date = st.sidebar.date_input("Start date", today - timedelta(days=7))  # Reduced default range to 7 days
-end_date = st.sidebar.date_input("End date", today)
-
-# Add interval selection
-interval_options = ["1h", "1d", "1wk"]  # Reduced to 3 options
-selected_interval = st.sidebar.selectbox("Select Interval", interval_options, index=0)  # Default to 1h
-
-# Create a selectbox for choosing the currency to display (outside the columns)
-selected_currency = st.sidebar.selectbox("Select Currency for Charts", list(currencies.keys()))
+# Pairs come from currencies.json; only the THB legs are downloaded, crosses are derived from them
+universe = load_universe()
+# EXCHANGE_PAIRS=EUR/THB,USD/THB limits the dashboard to some of the pairs (bench_dashboard.py varies it)
+if os.environ.get("EXCHANGE_PAIRS"):
+    universe = universe.select(os.environ["EXCHANGE_PAIRS"].split(","))
+currencies = universe.names
 
 # Fetch data for all currencies
-exchange_data = {}
-for currency, ticker in currencies.items():
-    exchange_data[currency] = get_exchange_data(ticker, start_date, end_date, interval=selected_interval) # Pass interval
-
-# --- Main Content ---
-st.title("📊 Exchange Rate Statistics")
-st.write("Explore key statistics for major currency exchange rates.")
+with metrics.section("fetch") as fetched, st.spinner("Loading exchange rates..."):
+    snapshot = get_all_exchange_data(universe.tickers, start_date, end_date, interval=selected_interval) # Pass interval
+    triangulator = get_triangulator(universe.tickers, start_date, end_date, selected_interval, snapshot.version, universe.cross_mode, universe, snapshot.frames)
+    exchange_data = universe.frames(snapshot.frames, triangulator)
+    fetched.rows = sum(len(data) for data in exchange_data.values())
+with metrics.section("stats", rows=fetched.rows):
+    rolling = {currency: update_rolling_stats(currency, data) for currency, data in exchange_data.items() if not data.empty}
+    stats = get_dashboard_stats(tuple(currencies), start_date, end_date, selected_interval, snapshot.version, exchange_data, rolling)
 
 # --- Statistics Display ---------------------------------------------------------------------------------------------------------------------------
 st.header("Exchange Rate Summary")
 
-cols = st.columns(len(currencies), gap="small")  # Create columns dynamically based on the number of currencies
-
-for i, (currency, data) in enumerate(exchange_data.items()):
-    with cols[i]:
-        st.subheader(f"{currency}")
-        if not data.empty:
-            latest_rate = data['Close'].iloc[-1]
-            previous_rate = data['Close'].iloc[-2] if len(data) >= 2 else latest_rate
-            daily_change = latest_rate - previous_rate
-            daily_change_percent = (daily_change / previous_rate) * 100 if previous_rate != 0 else 0
-            max_rate = data['Close'].max()
-            min_rate = data['Close'].min()
-            average_rate = data['Close'].mean()
-            volatility = data['Close'].std()
-
-            st.metric(label="Current Rate", value=f"{latest_rate:.2f}")
-
-            if daily_change > -1:
-                st.metric(label="Daily Change", value=f"{daily_change:.3f}", delta=f"{daily_change_percent:.3f}%", delta_color="normal")
-            else:
-                st.metric(label="Daily Change", value=f"{daily_change:.3f}", delta=f"{daily_change_percent:.3f}%", delta_color="inverse")
-
-            st.write(f"**Max:** {max_rate:.2f}")
-            st.write(f"**Min:** {min_rate:.2f}")
-            st.write(f"**Average:** {average_rate:.2f}")
-            st.write(f"**Volatility:** {volatility:.2f}")
-        else:
-            st.warning(f"No data available for {currency}")
+with metrics.section("summary", rows=fetched.rows):
+    # One row per pair; the table scrolls (and only renders visible rows) however many pairs are configured
+    summary = stats.summary.reindex(currencies)[["latest_rate", "daily_change", "daily_change_percent", "max_rate", "min_rate", "average_rate", "volatility"]]
+    summary.columns = ["Rate", "Daily Change", "Daily Change %", "Max", "Min", "Average", "Volatility"]
+    summary["Updated (s ago)"] = [universe.age(snapshot, currency) for currency in currencies]
+    st.dataframe(
+        summary,
+        width="stretch",
+        height=min(len(summary), 12) * 35 + 38,  # At most 12 rows visible, the rest scrolls
+        column_config={
+            "Rate": st.column_config.NumberColumn(format="%.4f"),
+            "Daily Change": st.column_config.NumberColumn(format="%.4f"),
+            "Daily Change %": st.column_config.NumberColumn(format="%.3f%%"),
+            "Max": st.column_config.NumberColumn(format="%.4f"),
+            "Min": st.column_config.NumberColumn(format="%.4f"),
+            "Average": st.column_config.NumberColumn(format="%.4f"),
+            "Volatility": st.column_config.NumberColumn(format="%.4f"),
+            "Updated (s ago)": st.column_config.NumberColumn(format="%.0f"),
+        },
+    )
+    missing = [currency for currency in currencies if currency not in stats.pairs]
+    if missing:
+        st.warning(f"No data available for {', '.join(missing)}")
+
+# --- Cross Rate Matrix ---------------------------------------------------------------------------------------------------------------------------
+with metrics.section("cross_matrix", rows=len(triangulator.currencies) ** 2):
+    if len(triangulator.currencies) > 2:
+        st.subheader("Cross Rates (row / column)")
+        cross_rates, cross_changes = triangulator.cross_matrix()  # Every cross from the downloaded THB legs, no extra requests
+        tab_rates, tab_changes = st.tabs(["Latest Rate", "Daily Change %"])
+        with tab_rates:
+            st.dataframe(cross_rates, width="stretch", column_config={c: st.column_config.NumberColumn(format="%.4f") for c in cross_rates.columns})
+        with tab_changes:
+            st.dataframe(cross_changes, width="stretch", column_config={c: st.column_config.NumberColumn(format="%.3f%%") for c in cross_changes.columns})
 
 # --- Charts Display ---
 st.header("Exchange Rate Trends")
 
-# Create columns for charts
-col1, col2, col3 = st.columns(3)
-
-# --- Line: Basic Area Chart (ECharts) ---------------------------------------------------------------------------------------------------------------------------
-with col1:
-    st.subheader("Basic Area Chart")
-
-    if selected_currency in exchange_data:
-        data = exchange_data[selected_currency]
-        if not data.empty:
-            # Prepare data for ECharts
-            dates = data.index.strftime('%Y-%m-%d %H:%M').tolist() if selected_interval not in ["1d", "1wk"] else data.index.strftime('%Y-%m-%d').tolist()
-            rates = data['Close'].tolist()
-
-            # Calculate the range of y-axis
-            min_rate = min(rates)
-            max_rate = max(rates)
-            range_y = max_rate - min_rate
-            
-            # Find the index of the maximum and minimum values
-            max_index = rates.index(max(rates)) if rates else -1
-            min_index = rates.index(min(rates)) if rates else -1
-
-            # ECharts options for Basic Area Chart
-            options = {
-                "title": {"text": f"{selected_currency} Exchange Rate Trend"},
-                "tooltip": {"trigger": "axis", "axisPointer": {"type": "cross", "label": {"backgroundColor": "#6a7985"}}},
-                "xAxis": {"type": "category", "boundaryGap": False, "data": dates, "name": "Date"},
-                "yAxis": {
-                    "type": "value",
-                    "name": "Exchange Rate",
-                    "min": f"{min_rate - range_y * 0.1:.2f}", # Add min
-                    "max": f"{max_rate + range_y * 0.1:.2f}", # Add max
-                },
-                "series": [
-                    {
-                        "data": rates,
-                        "type": "line",
-                        "smooth": False,
-                        "areaStyle": {},  # Enable area fill
-                    }
-                ],
-            }
+# --- Selected Currency Panels ------------------------------------------------------------------------------------------------------------------------------------
+# Everything in this fragment depends on the fetched data plus the two widgets defined inside it
+# (currency and point budget). Changing either of them reruns only this fragment; the sidebar inputs
+# (date range, interval) still rerun the whole script because every panel depends on them.
+@st.fragment(run_every=DEFAULT_REFRESH if stream_mode() else None)  # Streaming: rerun on a timer to pick up new ticks
+def selected_currency_panels():
+    started = time.perf_counter()
+
+    # Create a selectbox for choosing the currency to display
+    col_currency, col_budget = st.columns([0.7, 0.3])
+    with col_currency:
+        selected_currency = st.selectbox("Select Currency for Charts", currencies)
+    with col_budget:
+        # Long series are downsampled to this many points per chart before being sent to the browser
+        point_budget = st.number_input("Max Points per Chart", min_value=100, max_value=20000, value=DEFAULT_POINT_BUDGET, step=100)
+
+    # Streaming: the selected pair's buffered ticks extend its latest bar, history is not refetched
+    # (folding is idempotent, so the frame can be replaced on every timed rerun)
+    selected_pair = universe.pair(selected_currency)
+    if stream_mode() and selected_pair.ticker and selected_currency in exchange_data:
+        exchange_data[selected_currency] = live_bars(exchange_data[selected_currency], get_tick_hub(universe.tickers).buffer(selected_pair.ticker), selected_interval)
+
+    # Bars behind every single-currency panel, the rows each of their sections reports
+    selected_rows = len(exchange_data.get(selected_currency, ()))
+
+    # Downsampled bars of the selected currency and their time axis, shared by the single-currency panels
+    if selected_currency in exchange_data and not exchange_data[selected_currency].empty:
+        keep = downsample_indices(exchange_data[selected_currency]['Close'].to_numpy(), point_budget)  # max/min bars are always kept
+        timestamps = axis_times(selected_currency, selected_interval, exchange_data[selected_currency].index[keep])
+
+    # Create columns for charts
+    col1, col2, col3 = st.columns(3)
+
+    # --- Line: Basic Area Chart (ECharts) ---------------------------------------------------------------------------------------------------------------------------
+    with col1, metrics.section("area", rows=selected_rows):
+        st.subheader("Basic Area Chart")
+
+        if selected_currency in exchange_data:
+            data = exchange_data[selected_currency]
+            if not data.empty:
+                # Prepare data for ECharts
+                source = dataset({"time": timestamps, "Close": data['Close'].to_numpy()[keep]})
+
+                # Calculate the range of y-axis
+                min_rate = stats.pairs[selected_currency].min_rate
+                max_rate = stats.pairs[selected_currency].max_rate
+                range_y = max_rate - min_rate
+
+                # ECharts options for Basic Area Chart
+                options = {
+                    "title": {"text": f"{selected_currency} Exchange Rate Trend"},
+                    "tooltip": {"trigger": "axis", "axisPointer": {"type": "cross", "label": {"backgroundColor": "#6a7985"}}},
+                    "dataset": source,
+                    "xAxis": {"type": "time", "boundaryGap": False, "name": "Date"},
+                    "yAxis": {
+                        "type": "value",
+                        "name": "Exchange Rate",
+                        "min": f"{min_rate - range_y * 0.1:.2f}", # Add min
+                        "max": f"{max_rate + range_y * 0.1:.2f}", # Add max
+                    },
+                    "series": [
+                        {
+                            "type": "line",
+                            "seriesLayoutBy": "row",
+                            "encode": {"x": "time", "y": "Close"},
+                            "smooth": False,
+                            "areaStyle": {},  # Enable area fill
+                        }
+                    ],
+                }
 
-            # Display the chart using st_echarts
-            st_echarts(options=options, height="500px")
+                # Display the chart using st_echarts
+                st_echarts(options=options, height="500px")
+            else:
+                st.warning(f"No data available for {selected_currency} to display the Basic Area Chart.")
         else:
-            st.warning(f"No data available for {selected_currency} to display the Basic Area Chart.")
-    else:
-        st.warning("Please select a currency.")
-
-# --- Bar: Basic Bar Chart (ECharts) ---------------------------------------------------------------------------------------------------------------------------
-with col2:
-    st.subheader("Basic Bar Chart")
-
-    if selected_currency in exchange_data:
-        data = exchange_data[selected_currency]
-        if not data.empty:
-            # Prepare data for ECharts
-            dates = data.index.strftime('%Y-%m-%d %H:%M').tolist() if selected_interval not in ["1d", "1wk"] else data.index.strftime('%Y-%m-%d').tolist()
-            rates = data['Close'].tolist()
-            
-            # Find the index of the maximum and minimum values
-            max_index = rates.index(max(rates)) if rates else -1
-            min_index = rates.index(min(rates)) if rates else -1
-
-            # Calculate the range of y-axis
-            min_rate = min(rates)
-            max_rate = max(rates)
-            range_y = max_rate - min_rate
-
-            # ECharts options for Basic Bar Chart
-            options = {
-                "title": {"text": f"{selected_currency} Exchange Rate Trend"},
-                "tooltip": {"trigger": "axis", "axisPointer": {"type": "shadow"}},
-                "xAxis": {"type": "category", "data": dates, "name": "Date"},
-                "yAxis": {
-                    "type": "value",
-                    "name": "Exchange Rate",
-                    "min": f"{min_rate - range_y * 0.1:.2f}",
-                    "max": f"{max_rate + range_y * 0.1:.2f}",
-                },
-                "series": [
-                    {
-                        "data": rates,
-                        "type": "bar",
-                        "itemStyle": {
-                            "color": {
-                                "type": "linear",
-                                "x": 0,
-                                "y": 0,
-                                "x2": 0,
-                                "y2": 1,
-                                "colorStops": [
-                                    {"offset": 0, "color": "#5470c6"},  # Color at the bottom
-                                    {"offset": 1, "color": "#5470c6"},  # Color at the top
+            st.warning("Please select a currency.")
+
+    # --- Bar: Basic Bar Chart (ECharts) ---------------------------------------------------------------------------------------------------------------------------
+    with col2, metrics.section("bar", rows=selected_rows):
+        st.subheader("Basic Bar Chart")
+
+        if selected_currency in exchange_data:
+            data = exchange_data[selected_currency]
+            if not data.empty:
+                # Prepare data for ECharts
+                rates = data['Close'].to_numpy()[keep]
+                source = dataset({"time": timestamps, "Close": rates})
+
+                # Calculate the range of y-axis
+                min_rate = stats.pairs[selected_currency].min_rate
+                max_rate = stats.pairs[selected_currency].max_rate
+                range_y = max_rate - min_rate
+
+                # Find the time of the maximum and minimum values
+                max_time = timestamps[int(rates.argmax())]
+                min_time = timestamps[int(rates.argmin())]
+
+                # ECharts options for Basic Bar Chart
+                options = {
+                    "title": {"text": f"{selected_currency} Exchange Rate Trend"},
+                    "tooltip": {"trigger": "axis", "axisPointer": {"type": "shadow"}},
+                    "dataset": source,
+                    "xAxis": {"type": "time", "name": "Date"},
+                    "yAxis": {
+                        "type": "value",
+                        "name": "Exchange Rate",
+                        "min": f"{min_rate - range_y * 0.1:.2f}",
+                        "max": f"{max_rate + range_y * 0.1:.2f}",
+                    },
+                    "series": [
+                        {
+                            "type": "bar",
+                            "seriesLayoutBy": "row",
+                            "encode": {"x": "time", "y": "Close"},
+                            "itemStyle": {
+                                "color": {
+                                    "type": "linear",
+                                    "x": 0,
+                                    "y": 0,
+                                    "x2": 0,
+                                    "y2": 1,
+                                    "colorStops": [
+                                        {"offset": 0, "color": "#5470c6"},  # Color at the bottom
+                                        {"offset": 1, "color": "#5470c6"},  # Color at the top
+                                    ],
+                                }
+                            },
+                            "markPoint": {
+                                "data": [
+                                    {
+                                        "name": "Max",
+                                        "coord": [max_time, max_rate],
+                                        "itemStyle": {"color": "green"},
+                                    },
+                                    {
+                                        "name": "Min",
+                                        "coord": [min_time, min_rate],
+                                        "itemStyle": {"color": "red"},
+                                    },
                                 ],
-                            }
+                                "symbolSize": 30,
+                            },
+                        }
+                    ],
+                }
+                # Display the chart using st_echarts
+                st_echarts(options=options, height="500px")
+            else:
+                st.warning(f"No data available for {selected_currency} to display the Basic Bar Chart.")
+        else:
+            st.warning("Please select a currency.")
+
+    # --- Basic Candlestick Chart (ECharts) ---------------------------------------------------------------------------------------------------------------------------
+    with col3, metrics.section("candlestick", rows=selected_rows):
+        st.subheader("Basic Candlestick Chart")
+
+        if selected_currency in exchange_data:
+            data = exchange_data[selected_currency]
+            if not data.empty:
+                # Merge consecutive bars into OHLC buckets when the series is longer than the point budget
+                starts, ohlc = ohlc_buckets(data['Open'], data['High'], data['Low'], data['Close'], point_budget)
+
+                # Candlestick dimensions: [open, close, lowest, highest]
+                source = dataset({"time": axis_times(selected_currency, selected_interval, data.index[starts]), "Open": ohlc[:, 0], "Close": ohlc[:, 1], "Low": ohlc[:, 2], "High": ohlc[:, 3]})
+
+                # Calculate the range of y-axis (buckets keep the overall high and low)
+                min_rate = ohlc.min()
+                max_rate = ohlc.max()
+                range_y = max_rate - min_rate
+
+                # ECharts options for Basic Candlestick Chart
+                options = {
+                    "title": {"text": f"{selected_currency} Candlestick Chart"},
+                    "tooltip": {"trigger": "axis", "axisPointer": {"type": "cross"}},
+                    "dataset": source,
+                    "xAxis": {"type": "time", "name": "Date"},
+                    "yAxis": {
+                        "type": "value",
+                        "name": "Exchange Rate",
+                        "min": f"{min_rate - range_y * 0.1:.2f}",
+                        "max": f"{max_rate + range_y * 0.1:.2f}",
+                    },
+                    "series": [
+                        {
+                            "type": "candlestick",
+                            "seriesLayoutBy": "row",
+                            "encode": {"x": "time", "y": ["Open", "Close", "Low", "High"]},
+                            "itemStyle": {
+                                "color": "green",
+                                "color0": "red",
+                                "borderColor": "green",
+                                "borderColor0": "red",
+                            },
+                        }
+                    ],
+                }
+
+                # Display the chart using st_echarts
+                st_echarts(options=options, height="500px")
+            else:
+                st.warning(f"No data available for {selected_currency} to display the Basic Candlestick Chart.")
+        else:
+            st.warning("Please select a currency.")
+
+    # --- Box Plot and Trend Gauge in Columns ------------------------------------------------------------------------------------------------------------------------------------
+    st.subheader("Distribution and Trend")
+
+    col_box, col_gauge = st.columns([0.67, 0.33])
+
+    with col_box, metrics.section("box", rows=selected_rows):
+        st.subheader("Box Plot (Distribution and Outliers)")
+
+        if selected_currency in exchange_data:
+            data = exchange_data[selected_currency]
+            if not data.empty:
+                # Prepare data for ECharts
+                box_plot_data = []
+                outliers_data = []
+
+                # Box plot statistics
+                pair = stats.pairs[selected_currency]
+                Q1 = pair.q1
+                Q3 = pair.q3
+                IQR = Q3 - Q1
+                lower_bound = Q1 - 1.5 * IQR
+                upper_bound = Q3 + 1.5 * IQR
+
+                # Extract outliers
+                outliers = data['Close'][(data['Close'] < lower_bound) | (data['Close'] > upper_bound)]
+
+                # Prepare box plot data
+                box_plot_data.append([pair.min_rate, Q1, pair.median, Q3, pair.max_rate])
+
+                # Prepare outliers data
+                for index, value in outliers.items():
+                    outliers_data.append([0, value])
+
+                # Calculate the range of y-axis
+                min_rate = pair.min_rate
+                max_rate = pair.max_rate
+                range_y = max_rate - min_rate
+
+                # ECharts options for Box Plot
+                options = {
+                    "title": {"text": f"{selected_currency} Box Plot"},
+                    "tooltip": {"trigger": "item", "axisPointer": {"type": "shadow"}},
+                    "grid": {"left": "10%", "right": "10%", "bottom": "15%"},
+                    "xAxis": {
+                        "type": "category",
+                        "data": ["Exchange Rate"],
+                        "boundaryGap": True,
+                        "nameGap": 30,
+                        "splitArea": {"show": False},
+                        "axisLabel": {"formatter": "Exchange Rate"},
+                        "splitLine": {"show": False},
+                    },
+                    "yAxis": {
+                        "type": "value",
+                        "name": "Exchange Rate",
+                        "splitArea": {"show": True},
+                        "min": f"{min_rate - range_y * 0.1:.2f}",
+                        "max": f"{max_rate + range_y * 0.1:.2f}",
+                    },
+                    "series": [
+                        {
+                            "name": "Box Plot",
+                            "type": "boxplot",
+                            "data": box_plot_data,
+                            "itemStyle": {
+                                "color": "#5470c6",
+                                "borderColor": "#5470c6",
+                            },
                         },
-                        "markPoint": {
-                            "data": [
-                                {
-                                    "name": "Max",
-                                    "coord": [max_index, max(rates)],
-                                    "itemStyle": {"color": "green"},
-                                },
-                                {
-                                    "name": "Min",
-                                    "coord": [min_index, min(rates)],
-                                    "itemStyle": {"color": "red"},
-                                },
-                            ],
-                            "symbolSize": 30,
+                        {
+                            "name": "Outliers",
+                            "type": "scatter",
+                            "data": outliers_data,
+                            "itemStyle": {
+                                "color": "red",
+                            },
+                            "tooltip": {
+                                "formatter": "Outlier: {b}"
+                            }
+                        }
+                    ],
+                }
+
+                # Display the chart using st_echarts
+                st_echarts(options=options, height="500px")
+            else:
+                st.warning(f"No data available for {selected_currency} to display the Box Plot.")
+        else:
+            st.warning("Please select a currency.")
+
+    #--- Trend Gauge ------------------------------------------------------------------------------------------------------------
+    with col_gauge, metrics.section("gauge", rows=selected_rows):
+        st.subheader("Trend Gauge")
+
+        if selected_currency in exchange_data:
+            data = exchange_data[selected_currency]
+            if not data.empty:
+                # Calculate the trend based on the last two data points
+                trend = stats.pairs[selected_currency].daily_change
+
+                # Determine the trend direction and color
+                if trend > 0:
+                    trend_direction = "Upward"
+                    trend_color = "green"
+                elif trend < 0:
+                    trend_direction = "Downward"
+                    trend_color = "red"
+                else:
+                    trend_direction = "Stable"
+                    trend_color = "gray"
+
+                # ECharts options for Gauge
+                options = {
+                    "title": {"text": f"{selected_currency} Trend"},
+                    "tooltip": {"formatter": "{a} <br/>{b} : {c}"},
+                    "series": [
+                        {
+                            "name": "Trend",
+                            "type": "gauge",
+                            "detail": {"formatter": "{value}"},
+                            "data": [{"value": f"{abs(trend):.2f} ","name": f"{trend_direction} Trend"}],
+                            "axisLine": {
+                                "lineStyle": {
+                                    "color": [[1, trend_color]],  # Set color based on trend
+                                    "width": 10,
+                                }
+                            },
+                            "progress": {
+                                "show": True,
+                                "width": 10,
+                            },
+                            "pointer": {
+                                "show": False,
+                            },
+                            "axisTick": {
+                                "show": False,
+                            },
+                            "splitLine": {
+                                "show": False,
+                            },
+                            "axisLabel": {
+                                "show": False,
+                            },
+                        }
+                    ],
+                }
+
+                # Display the chart using st_echarts
+                st_echarts(options=options, height="400px")
+            else:
+                st.warning(f"No data available for {selected_currency} to display the Trend Gauge.")
+        else:
+            st.warning("Please select a currency.")
+
+    #--- Trendline หรือ Moving Average Overlay----------------------------------------------------------------------------------------------------
+    MA_COLORS = ["#FF0087", "#FFBF00", "#00DDFF", "#80FFA5"]  # One per selectable window
+    with metrics.section("moving_average", rows=selected_rows):
+        st.subheader("Trendline and Moving Average Overlay")
+
+        if selected_currency in exchange_data:
+            data = exchange_data[selected_currency]
+            if not data.empty:
+                # Prepare data for ECharts
+                rates = data['Close'].to_numpy()
+
+                # Calculate the range of y-axis
+                min_rate = stats.pairs[selected_currency].min_rate
+                max_rate = stats.pairs[selected_currency].max_rate
+                range_y = max_rate - min_rate
+
+                # Moving averages of the chosen windows, kept incrementally: a refresh or a streamed tick only folds in the new bars
+                windows = st.multiselect("Moving Average Windows", DEFAULT_WINDOWS, default=[DEFAULT_WINDOWS[0]], key="ma_windows")
+                rolling_stats = update_rolling_stats(selected_currency, data, live=stream_mode() and bool(selected_pair.ticker))
+                columns = {"time": timestamps, "Close": rates[keep]}
+                for window_size in windows:
+                    moving_averages = rolling_stats.moving_average(window_size)
+
+                    # Fill NaN values at the beginning with the first valid moving average
+                    # Check if there are enough data points to calculate the moving average
+                    if len(moving_averages) >= window_size:
+                        moving_averages[:window_size - 1] = moving_averages[window_size - 1]
+                    else:
+                        # If not enough data points, use the original rates for the moving average
+                        moving_averages = rates
+                        st.warning(f"Not enough data points to calculate a {window_size}-period moving average. Using original data instead.")
+                    # Every line at the same downsampled bars as the other panels
+                    columns[f"MA {window_size}"] = moving_averages[keep]
+                source = dataset(columns)
+
+                # ECharts options for Trendline or Moving Average Overlay
+                options = {
+                    "title": {"text": f"{selected_currency} Exchange Rate with Moving Average"},
+                    "tooltip": {"trigger": "axis"},
+                    "dataset": source,
+                    "xAxis": {"type": "time", "name": "Date"},
+                    "yAxis": {
+                        "type": "value",
+                        "name": "Exchange Rate",
+                        "min": f"{min_rate - range_y * 0.1:.2f}",
+                        "max": f"{max_rate + range_y * 0.1:.2f}",
+                    },
+                    "series": [
+                        {
+                            "name": "Exchange Rate",
+                            "type": "line",
+                            "seriesLayoutBy": "row",
+                            "encode": {"x": "time", "y": "Close"},
+                            "smooth": True,
+                            "lineStyle": {"color": "#5470c6"},
                         },
-                    }
-                ],
-            }
-            # Display the chart using st_echarts
-            st_echarts(options=options, height="500px")
+                    ] + [
+                        {
+                            "name": f"{window_size}-Period Moving Average",
+                            "type": "line",
+                            "seriesLayoutBy": "row",
+                            "encode": {"x": "time", "y": f"MA {window_size}"},
+                            "smooth": True,
+                            "lineStyle": {"color": MA_COLORS[i % len(MA_COLORS)]},
+                        }
+                        for i, window_size in enumerate(windows)
+                    ],
+                }
+
+                # Display the chart using st_echarts
+                st_echarts(options=options, height="500px")
+                # Rolling mean, std and range of the last bars of each window, from the same accumulators
+                for window_size in windows:
+                    mean, std, low, high = rolling_stats.window(window_size)
+                    if not np.isnan(mean):
+                        st.caption(f"Last {window_size} bars: mean {mean:.4f}, std {std:.4f}, range {low:.4f} – {high:.4f}")
+            else:
+                st.warning(f"No data available for {selected_currency} to display the Trendline or Moving Average Overlay.")
         else:
-            st.warning(f"No data available for {selected_currency} to display the Basic Bar Chart.")
-    else:
-        st.warning("Please select a currency.")
-
-# --- Basic Candlestick Chart (ECharts) ---------------------------------------------------------------------------------------------------------------------------
-with col3:
-    st.subheader("Basic Candlestick Chart")
-
-    if selected_currency in exchange_data:
-        data = exchange_data[selected_currency]
-        if not data.empty:
-            # Prepare data for ECharts
-            dates = data.index.strftime('%Y-%m-%d %H:%M').tolist() if selected_interval not in ["1d", "1wk"] else data.index.strftime('%Y-%m-%d').tolist()
-            
-            # Candlestick data format: [open, close, lowest, highest]
-            candlestick_data = data[['Open', 'Close', 'Low', 'High']].values.tolist()
-
-            # Calculate the range of y-axis
-            all_rates = data[['Open', 'Close', 'Low', 'High']].values.flatten().tolist()
-            min_rate = min(all_rates)
-            max_rate = max(all_rates)
-            range_y = max_rate - min_rate
-
-            # ECharts options for Basic Candlestick Chart
-            options = {
-                "title": {"text": f"{selected_currency} Candlestick Chart"},
-                "tooltip": {"trigger": "axis", "axisPointer": {"type": "cross"}},
-                "xAxis": {"type": "category", "data": dates, "name": "Date"},
-                "yAxis": {
-                    "type": "value",
-                    "name": "Exchange Rate",
-                    "min": f"{min_rate - range_y * 0.1:.2f}",
-                    "max": f"{max_rate + range_y * 0.1:.2f}",
-                },
-                "series": [
-                    {
-                        "data": candlestick_data,
-                        "type": "candlestick",
-                        "itemStyle": {
-                            "color": "green",
-                            "color0": "red",
-                            "borderColor": "green",
-                            "borderColor0": "red",
+            st.warning("Please select a currency.")
+
+    # --- Scatter Plot ---------------------------------------------------------------------------------------------------------------------------
+    with metrics.section("scatter", rows=selected_rows):
+        st.subheader("Scatter Plot (Closing Prices vs. Date)")
+
+        if selected_currency in exchange_data:
+            data = exchange_data[selected_currency]
+            if not data.empty:
+                # Prepare data for ECharts: (closing price, time) points
+                source = dataset({"Close": data['Close'].to_numpy()[keep], "time": timestamps})
+
+                # Calculate the range of x-axis
+                min_price = stats.pairs[selected_currency].min_rate
+                max_price = stats.pairs[selected_currency].max_rate
+                range_x = max_price - min_price
+
+                # ECharts options for Scatter Plot
+                options = {
+                    "title": {"text": f"{selected_currency} Closing Prices Scatter Plot"},
+                    "tooltip": {
+                        "trigger": "item",
+                    },
+                    "xAxis": {
+                        "type": "value",
+                        "name": "Closing Price",
+                        "min": f"{min_price - range_x * 0.1:.2f}",
+                        "max": f"{max_price + range_x * 0.1:.2f}",
+                    },
+                    "dataset": source,
+                    "yAxis": {"type": "time", "name": "Date"},
+                    "visualMap": {
+                        "show": True,
+                        "min": min_price,
+                        "max": max_price,
+                        "dimension": 0,  # Use the first dimension (price) for visual mapping
+                        "inRange": {
+                            "color": ['#37A2FF', '#80FFA5', '#FFBF00', '#FF0087', '#00DDFF'],  # Darker blue gradient
+                            "symbolSize": 10, # Adjust symbol size based on value
                         },
-                    }
-                ],
-            }
+                        "calculable": True,
+                        "orient": "horizontal",
+                        "left": "center",
+                        "bottom": "10%",
+                    },
+                    "series": [
+                        {
+                            "type": "scatter",
+                            "seriesLayoutBy": "row",
+                            "encode": {"x": "Close", "y": "time"},
+                            "symbolSize": 10,
+                            "itemStyle": {
+                                "color": "#08519c", # Darker default color
+                            },
+                            "emphasis": {
+                                "focus": "series",
+                                "itemStyle": {
+                                    "color": "#FFD700",  # Highlight color on hover (Gold)
+                                    "borderColor": "#FFD700", # Darker border color (Saddle Brown)
+                                    "borderWidth": 2,
+                                },
+                            },
+                        }
+                    ],
+                }
 
-            # Display the chart using st_echarts
-            st_echarts(options=options, height="500px")
+                # Display the chart using st_echarts
+                st_echarts(options=options, height=f"{800}px")
+            else:
+                st.warning(f"No data available for {selected_currency} to display the Scatter Plot.")
         else:
-            st.warning(f"No data available for {selected_currency} to display the Basic Candlestick Chart.")
-    else:
-        st.warning("Please select a currency.")
+            st.warning("Please select a currency.")
+
+    # Wall time of the last fragment run, for comparing against a full-script rerun
+    st.session_state["selected_currency_panels_seconds"] = time.perf_counter() - started
+
+
+selected_currency_panels()
 
 # --- Gradient Stacked Area Chart (ECharts) ---------------------------------------------------------------------------------------------------------------------------
-st.subheader("Gradient Stacked Area Chart (All Currencies - Daily Change %)")
-
-if all(not data.empty for data in exchange_data.values()):
-    # Prepare data for ECharts
-    dates = list(exchange_data.values())[0].index.strftime('%Y-%m-%d %H:%M').tolist() if selected_interval not in ["1d", "1wk"] else list(exchange_data.values())[0].index.strftime('%Y-%m-%d').tolist()
-
-    series_data = []
-    
-    # Use the provided colors directly
-    colors = ['#37A2FF', '#80FFA5', '#FFBF00', '#FF0087', '#00DDFF']
-    
-    for i, (currency, data) in enumerate(exchange_data.items()):
-        # Calculate daily change percentage
-        daily_changes = data['Close'].pct_change() * 100
-        daily_changes.iloc[0] = 0  # Set the first value to 0 (no change for the first day)
-        rates = daily_changes.tolist()
-        
-        # Get colors for the current currency
-        start_color = colors[i]
-        
-        # Create a linear gradient with the same start and end color for a solid fill
-        series_data.append({
-            "name": currency,
-            "type": "line",
-            "smooth": True,
-            "stack": "Total",
-            "areaStyle": {
-                "color": {
-                    "type": "linear",
-                    "x": 0,
-                    "y": 0,
-                    "x2": 0,
-                    "y2": 1,
-                    "colorStops": [
-                        {"offset": 0, "color": start_color},
-                        {"offset": 1, "color": start_color},
-                    ],
-                }
-            },
-            "lineStyle": {"width": 0},
-            "showSymbol": False,
-            "data": rates,
-        })
-
-    # Calculate the range of y-axis
-    all_changes = []
-    for data in exchange_data.values():
-        daily_changes = data['Close'].pct_change() * 100
-        all_changes.extend(daily_changes.tolist())
-    
-    # Remove NaN values
-    all_changes = [x for x in all_changes if pd.notna(x)]
-
-    if all_changes: # Check if all_changes is not empty
-        min_change = min(all_changes)
-        max_change = max(all_changes)
+with metrics.section("stacked_area", rows=fetched.rows):
+    st.subheader("Gradient Stacked Area Chart (All Currencies - Daily Change %)")
+
+    if stats.all_available:
+        # Prepare data for ECharts: the shared time row plus one change % row per currency, all on the aligned index
+        source = dataset(
+            {"time": axis_times("all", selected_interval, stats.aligned.index), **dict(zip(stats.aligned.pairs, stats.returns))},
+            digits=CHANGE_DIGITS,
+        )
+
+        series_data = []
+
+        # Use the provided colors directly
+        colors = ['#37A2FF', '#80FFA5', '#FFBF00', '#FF0087', '#00DDFF']
+
+        for i, currency in enumerate(exchange_data):
+            # Get colors for the current currency
+            start_color = colors[i % len(colors)]
+
+            # Create a linear gradient with the same start and end color for a solid fill
+            series_data.append({
+                "name": currency,
+                "type": "line",
+                "smooth": True,
+                "stack": "Total",
+                "areaStyle": {
+                    "color": {
+                        "type": "linear",
+                        "x": 0,
+                        "y": 0,
+                        "x2": 0,
+                        "y2": 1,
+                        "colorStops": [
+                            {"offset": 0, "color": start_color},
+                            {"offset": 1, "color": start_color},
+                        ],
+                    }
+                },
+                "lineStyle": {"width": 0},
+                "showSymbol": False,
+                "seriesLayoutBy": "row",
+                "encode": {"x": "time", "y": currency},  # Daily change %, first value is 0 (no change for the first day)
+            })
+
+        # Calculate the range of y-axis
+        min_change = stats.change_min
+        max_change = stats.change_max
         range_y = max_change - min_change
+
+        # ECharts options for Gradient Stacked Area Chart
+        options = {
+            "title": {"text": "All Currencies Gradient Stacked Area Chart (Daily Change %)"},
+            "tooltip": {"trigger": "axis", "axisPointer": {"type": "cross", "label": {"backgroundColor": "#6a7985"}}},
+            "dataset": source,
+            "xAxis": {
+                "type": "time",
+                "boundaryGap": False,
+                "name": "Date",
+            },
+            "yAxis": {
+                "type": "value",
+                "name": "Daily Change %",
+                "min": f"{min_change - range_y * 1:.2f}", # Adjusted to 10% padding
+                "max": f"{max_change + range_y * 1:.2f}", # Adjusted to 10% padding
+            },
+            "legend": {"data": currencies},
+            "series": series_data,
+        }
+
+        # Display the chart using st_echarts
+        st_echarts(options=options, height="500px")
     else:
-        min_change = -1
-        max_change = 1
-        range_y = 2
-
-    # ECharts options for Gradient Stacked Area Chart
-    options = {
-        "title": {"text": "All Currencies Gradient Stacked Area Chart (Daily Change %)"},
-        "tooltip": {"trigger": "axis", "axisPointer": {"type": "cross", "label": {"backgroundColor": "#6a7985"}}},
-        "xAxis": {
-            "type": "category",
-            "boundaryGap": False,
-            "data": dates,
-            "name": "Date",
-        },
-        "yAxis": {
-            "type": "value",
-            "name": "Daily Change %",
-            "min": f"{min_change - range_y * 1:.2f}", # Adjusted to 10% padding
-            "max": f"{max_change + range_y * 1:.2f}", # Adjusted to 10% padding
-        },
-        "legend": {"data": list(currencies.keys())},
-        "series": series_data,
-    }
-
-    # Display the chart using st_echarts
-    st_echarts(options=options, height="500px")
-else:
-    st.warning("Not all data available for all currencies to display the Gradient Stacked Area Chart.")
-    
+        st.warning("Not all data available for all currencies to display the Gradient Stacked Area Chart.")
+
+
 # --- Pie/Doughnut Chart and Heatmap in Columns ------------------------------------------------------------------------------------------------------------------
 st.subheader("Daily Change Analysis")
 
 col_left, col_right = st.columns([0.3, 0.7])
 
-with col_left:
+with col_left, metrics.section("pie", rows=fetched.rows):
     st.subheader("Pie/Doughnut Chart (Daily Change %)")
 
-    if all(not data.empty for data in exchange_data.values()):
+    if stats.all_available:
         # Prepare data for ECharts
         pie_data = []
-        for currency, data in exchange_data.items():
-            # Calculate daily change percentage
-            daily_change = data['Close'].iloc[-1] - data['Close'].iloc[-2] if len(data) >= 2 else 0
-            daily_change_percent = (daily_change / data['Close'].iloc[-2]) * 100 if len(data) >= 2 and data['Close'].iloc[-2] != 0 else 0
-            pie_data.append({"value": abs(daily_change_percent), "name": currency})
+        for currency in exchange_data:
+            pie_data.append({"value": abs(stats.pairs[currency].daily_change_percent), "name": currency})
 
         # ECharts options for Pie/Doughnut Chart
         options = {
             "title": {"text": "Daily Change % Distribution", "left": "center"},
             "tooltip": {"trigger": "item", "formatter": "{a} <br/>{b} : {c} ({d}%)"},
-            "legend": {"orient": "vertical", "left": "left", "data": list(currencies.keys())},
+            "legend": {"orient": "vertical", "left": "left", "data": currencies},
             "series": [
                 {
                     "name": "Daily Change %",
@@ -443,46 +854,36 @@ with col_left:
     else:
         st.warning("Not all data available for all currencies to display the Pie/Doughnut Chart.")
 
-with col_right:
+with col_right, metrics.section("heatmap", rows=fetched.rows):
     st.subheader("Heatmap (Daily Change %)")
 
-    if all(not data.empty for data in exchange_data.values()):
-        # Prepare data for ECharts
-        heatmap_data = []
-        dates = list(exchange_data.values())[0].index.strftime('%Y-%m-%d %H:%M').tolist() if selected_interval not in ["1d", "1wk"] else list(exchange_data.values())[0].index.strftime('%Y-%m-%d').tolist()
-        currencies_list = list(currencies.keys())
-
-        for i, (currency, data) in enumerate(exchange_data.items()):
-            # Calculate daily change percentage
-            daily_changes = data['Close'].pct_change() * 100
-            daily_changes.iloc[0] = 0  # Set the first value to 0 (no change for the first day)
-            rates = daily_changes.tolist()
-            for j, rate in enumerate(rates):
-                heatmap_data.append([j, i, rate])
-
-        # Calculate the range of values for the visual map
-        all_changes = []
-        for data in exchange_data.values():
-            daily_changes = data['Close'].pct_change() * 100
-            all_changes.extend(daily_changes.tolist())
-
-        # Remove NaN values
-        all_changes = [x for x in all_changes if pd.notna(x)]
-
-        if all_changes:  # Check if all_changes is not empty
-            min_change = min(all_changes)
-            max_change = max(all_changes)
+    if stats.all_available:
+        # Hourly bars can also be folded into hour-of-day x weekday buckets (mean change % of all pairs)
+        heatmap_view = st.radio("Heatmap Cells", ["Bars", "Hour × Weekday"], horizontal=True) if selected_interval == "1h" else "Bars"
+
+        # Prepare data for ECharts: [x, y, change %] cells as three dataset rows, straight from the returns matrix
+        if heatmap_view == "Bars":
+            x_labels = axis_labels("all", selected_interval, stats.aligned.index)  # Formatted once, reused across reruns
+            y_labels = list(stats.aligned.pairs)
+            x, y, change = heatmap_cells(stats.returns.T)
+            min_change, max_change = stats.change_min, stats.change_max
         else:
-            min_change = -1
-            max_change = 1
+            # The first row is the placeholder 0, not a real change
+            means = hour_weekday_means(stats.returns[:, 1:], stats.aligned.index[1:])
+            x_labels = [f"{hour:02d}:00" for hour in range(24)]
+            y_labels = WEEKDAYS
+            x, y, change = heatmap_cells(means)
+            min_change, max_change = value_bounds(means)
+        source = dataset({"bar": x.tolist(), "currency": y.tolist(), "change": change}, digits=CHANGE_DIGITS)
 
         # ECharts options for Heatmap
         options = {
             "title": {"text": "Daily Change % Heatmap"},
             "tooltip": {"position": "top"},
             "grid": {"height": "60%", "top": "20%"},
-            "xAxis": {"type": "category", "data": dates, "splitArea": {"show": True}},
-            "yAxis": {"type": "category", "data": currencies_list, "splitArea": {"show": True}},
+            "dataset": source,
+            "xAxis": {"type": "category", "data": x_labels, "splitArea": {"show": True}},
+            "yAxis": {"type": "category", "data": y_labels, "splitArea": {"show": True}},
             "visualMap": {
                 "min": min_change,
                 "max": max_change,
@@ -497,7 +898,8 @@ with col_right:
                 {
                     "name": "Daily Change %",
                     "type": "heatmap",
-                    "data": heatmap_data,
+                    "seriesLayoutBy": "row",
+                    "encode": {"x": "bar", "y": "currency"},  # visualMap reads the last dimension (change %)
                     "label": {"show": False},
                     "emphasis": {
                         "itemStyle": {
@@ -513,76 +915,22 @@ with col_right:
     else:
         st.warning("Not all data available for all currencies to display the Heatmap.")
 
-# --- Radar Chart and Box Plot in Columns ------------------------------------------------------------------------------------------------------------------------------------
+# --- Radar Chart ------------------------------------------------------------------------------------------------------------------------------------
 st.subheader("Comparative Analysis")
 
-col_radar, col_box, col_gauge = st.columns([0.4, 0.4, 0.2])  # Added a column for the gauge
+col_radar, col_corr = st.columns([0.4, 0.6])
 
-with col_radar:
+with col_radar, metrics.section("radar", rows=len(stats.pairs)):
     st.subheader("Radar Chart (Comparison of Exchange Rate Metrics)")
 
-    if all(not data.empty for data in exchange_data.values()):
-        # Prepare data for ECharts
-        radar_data = []
-        indicator = [
-            {"name": "Volatility", "max": 0, "min": 0},  # Added "min" for Volatility
-            {"name": "Daily Change %", "max": 0, "min": 0},  # Added "min" for Daily Change %
-            {"name": "Average Rate", "max": 0, "min": 0},  # Added "min" for Average Rate
-            {"name": "Max Rate", "max": 0, "min": 0},  # Added "min" for Max Rate
-            {"name": "Min Rate", "max": 0, "min": 0},  # Added "min" for Min Rate
-        ]
-
-        for currency, data in exchange_data.items():
-            latest_rate = data['Close'].iloc[-1]
-            previous_rate = data['Close'].iloc[-2] if len(data) >= 2 else latest_rate
-            daily_change = latest_rate - previous_rate
-            daily_change_percent = (daily_change / previous_rate) * 100 if previous_rate != 0 else 0  # Calculate daily change percentage
-            average_rate = data['Close'].mean()
-            max_rate = data['Close'].max()
-            min_rate = data['Close'].min()
-            volatility = data['Close'].std()
-
-            radar_data.append({
-                "value": [volatility, daily_change_percent, average_rate, max_rate, min_rate],  # Use daily change percentage
-                "name": currency,
-            })
-
-            # Update max and min values for indicators
-            indicator[0]["max"] = max(indicator[0]["max"], volatility * 1.1)  # Add 10% padding
-            indicator[0]["min"] = min(indicator[0]["min"], 0) # Volatility should not be negative.
-            
-            indicator[1]["max"] = max(indicator[1]["max"], daily_change_percent * 1.1)  # Add 10% padding
-            indicator[1]["min"] = min(indicator[1]["min"], daily_change_percent * 1.1) # Add 10% padding
-            
-            indicator[2]["max"] = max(indicator[2]["max"], average_rate * 1.1)  # Add 10% padding
-            indicator[2]["min"] = min(indicator[2]["min"], average_rate * 0.9) # Add 10% padding
-            
-            indicator[3]["max"] = max(indicator[3]["max"], max_rate * 1.1)  # Add 10% padding
-            indicator[3]["min"] = min(indicator[3]["min"], 0) # Max rate should not be negative.
-            
-            indicator[4]["max"] = max(indicator[4]["max"], min_rate * 1.1)  # Add 10% padding
-            indicator[4]["min"] = min(indicator[4]["min"], min_rate * 0.9)  # Add 10% padding and adjust for min rate
-
-            # Adjust min/max for Daily Change % to handle negative values properly
-            all_daily_changes = [item["value"][1] for item in radar_data]
-            max_daily_change = max(all_daily_changes)
-            min_daily_change = min(all_daily_changes)
-            
-            indicator[1]["max"] = max(indicator[1]["max"], max_daily_change * 1.1)
-            indicator[1]["min"] = min(indicator[1]["min"], min_daily_change * 1.1)
-            
-            # Ensure that min is always less than max
-            for ind in indicator:
-                if ind["min"] >= ind["max"]:
-                    ind["min"] = ind["max"] - (ind["max"] * 0.1) if ind["max"] != 0 else -1
-                    if ind["min"] >= ind["max"]:
-                        ind["min"] = ind["max"] - 1
-                    
+    if stats.all_available:
+        # Prepare data for ECharts (indicator bounds for all pairs in one pass)
+        indicator, radar_data = radar_chart_data(stats)
 
         # ECharts options for Radar Chart
         options = {
             # "title": {"text": "Radar Chart (Exchange Rate Metrics Comparison)"},
-            "legend": {"data": list(currencies.keys())},
+            "legend": {"data": currencies},
             "radar": {
                 "indicator": indicator,
                 "shape": "circle",  # Change shape to circle
@@ -627,289 +975,93 @@ with col_radar:
     else:
         st.warning("Not all data available for all currencies to display the Radar Chart.")
 
-with col_box:
-    st.subheader("Box Plot (Distribution and Outliers)")
-
-    if selected_currency in exchange_data:
-        data = exchange_data[selected_currency]
-        if not data.empty:
-            # Prepare data for ECharts
-            box_plot_data = []
-            outliers_data = []
-
-            # Calculate box plot statistics
-            Q1 = data['Close'].quantile(0.25)
-            Q3 = data['Close'].quantile(0.75)
-            IQR = Q3 - Q1
-            lower_bound = Q1 - 1.5 * IQR
-            upper_bound = Q3 + 1.5 * IQR
-
-            # Extract outliers
-            outliers = data['Close'][(data['Close'] < lower_bound) | (data['Close'] > upper_bound)]
-
-            # Prepare box plot data
-            box_plot_data.append([data['Close'].min(), Q1, data['Close'].median(), Q3, data['Close'].max()])
-
-            # Prepare outliers data
-            for index, value in outliers.items():
-                outliers_data.append([0, value])
-
-            # Calculate the range of y-axis
-            all_rates = data['Close'].tolist()
-            min_rate = min(all_rates)
-            max_rate = max(all_rates)
-            range_y = max_rate - min_rate
-
-            # ECharts options for Box Plot
-            options = {
-                "title": {"text": f"{selected_currency} Box Plot"},
-                "tooltip": {"trigger": "item", "axisPointer": {"type": "shadow"}},
-                "grid": {"left": "10%", "right": "10%", "bottom": "15%"},
-                "xAxis": {
-                    "type": "category",
-                    "data": ["Exchange Rate"],
-                    "boundaryGap": True,
-                    "nameGap": 30,
-                    "splitArea": {"show": False},
-                    "axisLabel": {"formatter": "Exchange Rate"},
-                    "splitLine": {"show": False},
-                },
-                "yAxis": {
-                    "type": "value",
-                    "name": "Exchange Rate",
-                    "splitArea": {"show": True},
-                    "min": f"{min_rate - range_y * 0.1:.2f}",
-                    "max": f"{max_rate + range_y * 0.1:.2f}",
-                },
-                "series": [
-                    {
-                        "name": "Box Plot",
-                        "type": "boxplot",
-                        "data": box_plot_data,
-                        "itemStyle": {
-                            "color": "#5470c6",
-                            "borderColor": "#5470c6",
-                        },
-                    },
-                    {
-                        "name": "Outliers",
-                        "type": "scatter",
-                        "data": outliers_data,
-                        "itemStyle": {
-                            "color": "red",
-                        },
-                        "tooltip": {
-                            "formatter": "Outlier: {b}"
-                        }
-                    }
-                ],
-            }
-
-            # Display the chart using st_echarts
-            st_echarts(options=options, height="500px")
-        else:
-            st.warning(f"No data available for {selected_currency} to display the Box Plot.")
-    else:
-        st.warning("Please select a currency.")
-
-#--- Trend Gauge ------------------------------------------------------------------------------------------------------------
-with col_gauge:
-    st.subheader("Trend Gauge")
-
-    if selected_currency in exchange_data:
-        data = exchange_data[selected_currency]
-        if not data.empty:
-            # Calculate the trend based on the last two data points
-            latest_rate = data['Close'].iloc[-1]
-            previous_rate = data['Close'].iloc[-2] if len(data) >= 2 else latest_rate
-            trend = latest_rate - previous_rate
-
-            # Determine the trend direction and color
-            if trend > 0:
-                trend_direction = "Upward"
-                trend_color = "green"
-            elif trend < 0:
-                trend_direction = "Downward"
-                trend_color = "red"
-            else:
-                trend_direction = "Stable"
-                trend_color = "gray"
-
-            # ECharts options for Gauge
-            options = {
-                "title": {"text": f"{selected_currency} Trend"},
-                "tooltip": {"formatter": "{a} <br/>{b} : {c}"},
-                "series": [
-                    {
-                        "name": "Trend",
-                        "type": "gauge",
-                        "detail": {"formatter": "{value}"},
-                        "data": [{"value": f"{abs(trend):.2f} ","name": f"{trend_direction} Trend"}],
-                        "axisLine": {
-                            "lineStyle": {
-                                "color": [[1, trend_color]],  # Set color based on trend
-                                "width": 10,
-                            }
-                        },
-                        "progress": {
-                            "show": True,
-                            "width": 10,
-                        },
-                        "pointer": {
-                            "show": False,
-                        },
-                        "axisTick": {
-                            "show": False,
-                        },
-                        "splitLine": {
-                            "show": False,
-                        },
-                        "axisLabel": {
-                            "show": False,
-                        },
-                    }
-                ],
-            }
-
-            # Display the chart using st_echarts
-            st_echarts(options=options, height="400px")
-        else:
-            st.warning(f"No data available for {selected_currency} to display the Trend Gauge.")
-    else:
-        st.warning("Please select a currency.")
-
-#--- Trendline หรือ Moving Average Overlay----------------------------------------------------------------------------------------------------
-st.subheader("Trendline and Moving Average Overlay")
-
-if selected_currency in exchange_data:
-    data = exchange_data[selected_currency]
-    if not data.empty:
-        # Prepare data for ECharts
-        dates = data.index.strftime('%Y-%m-%d %H:%M').tolist() if selected_interval not in ["1d", "1wk"] else data.index.strftime('%Y-%m-%d').tolist()
-        rates = data['Close'].tolist()
-
-        # Calculate the range of y-axis
-        min_rate = min(rates)
-        max_rate = max(rates)
-        range_y = max_rate - min_rate
-
-        # Calculate the moving average (e.g., 7-period moving average)
-        window_size = 7
-        moving_averages = data['Close'].rolling(window=window_size).mean().tolist()
-        
-        # Fill NaN values at the beginning with the first valid moving average
-        # Check if there are enough data points to calculate the moving average
-        if len(moving_averages) >= window_size:
-            for i in range(window_size - 1):
-                moving_averages[i] = moving_averages[window_size - 1]
-        else:
-            # If not enough data points, use the original rates for the moving average
-            moving_averages = rates[:]
-            st.warning(f"Not enough data points to calculate a {window_size}-period moving average. Using original data instead.")
-
-        # ECharts options for Trendline or Moving Average Overlay
+# --- Correlation Matrix ------------------------------------------------------------------------------------------------------------------------------------
+with col_corr, metrics.section("correlation", rows=len(stats.pairs) ** 2):
+    st.subheader("Correlation Matrix (Change %, Rolling Window)")
+
+    bars = max(stats.returns.shape[1] - 1, 0)  # The first bar is the placeholder 0, not a real change
+    has_correlation = len(stats.pairs) > 1 and bars > 1
+    if has_correlation:
+        window = st.number_input("Correlation Window (bars)", min_value=2, max_value=max(bars, 2),
+                                 value=min(DEFAULT_CORRELATION_WINDOW, bars), step=1, key="corr_window")
+        # Window sums kept across data refreshes: a refresh only folds the new bars in, every pair against every pair at once.
+        # Filled bars would count as 0% changes, so only the bars each pair printed go in
+        correlation = get_correlation(stats.aligned.pairs, start_date, end_date, selected_interval, window).update(
+            stats.aligned.pairs, stats.aligned.index[1:], stats.observed_returns()[:, 1:])
+        matrix = correlation.matrix()
+        if not np.isfinite(matrix[~np.eye(len(matrix), dtype=bool)]).any():
+            st.warning(f"No two currencies share {window} bars of change in this range; "
+                       "pick a shorter window, a longer date range or a finer interval.")
+        x, y, corr = heatmap_cells(matrix)
+        labels = list(stats.aligned.pairs)
         options = {
-            "title": {"text": f"{selected_currency} Exchange Rate with Moving Average"},
-            "tooltip": {"trigger": "axis"},
-            "xAxis": {"type": "category", "data": dates, "name": "Date"},
-            "yAxis": {
-                "type": "value",
-                "name": "Exchange Rate",
-                "min": f"{min_rate - range_y * 0.1:.2f}",
-                "max": f"{max_rate + range_y * 0.1:.2f}",
-            },
-            "series": [
-                {
-                    "name": "Exchange Rate",
-                    "data": rates,
-                    "type": "line",
-                    "smooth": True,
-                    "lineStyle": {"color": "#5470c6"},
-                },
-                {
-                    "name": f"{window_size}-Period Moving Average",
-                    "data": moving_averages,
-                    "type": "line",
-                    "smooth": True,
-                    "lineStyle": {"color": "#FF0087"},
-                },
-            ],
-        }
-
-        # Display the chart using st_echarts
-        st_echarts(options=options, height="500px")
-    else:
-        st.warning(f"No data available for {selected_currency} to display the Trendline or Moving Average Overlay.")
-else:
-    st.warning("Please select a currency.")
-
-# --- Scatter Plot ---------------------------------------------------------------------------------------------------------------------------
-st.subheader("Scatter Plot (Closing Prices vs. Date)")
-
-if selected_currency in exchange_data:
-    data = exchange_data[selected_currency]
-    if not data.empty:
-        # Prepare data for ECharts
-        dates = data.index.strftime('%Y-%m-%d %H:%M').tolist() if selected_interval not in ["1d", "1wk"] else data.index.strftime('%Y-%m-%d').tolist()
-        closing_prices = data['Close'].tolist()
-
-        scatter_data = [[price, date] for price, date in zip(closing_prices, dates)]
-
-        # Calculate the range of x-axis
-        min_price = min(closing_prices)
-        max_price = max(closing_prices)
-        range_x = max_price - min_price
-
-        # ECharts options for Scatter Plot
-        options = {
-            "title": {"text": f"{selected_currency} Closing Prices Scatter Plot"},
-            "tooltip": {
-                "trigger": "item",
-            },
-            "xAxis": {
-                "type": "value",
-                "name": "Closing Price",
-                "min": f"{min_price - range_x * 0.1:.2f}",
-                "max": f"{max_price + range_x * 0.1:.2f}",
-            },
-            "yAxis": {"type": "category", "data": dates, "name": "Date"},
+            "tooltip": {"position": "top"},
+            "grid": {"height": "65%", "top": "5%", "left": "15%"},
+            "dataset": dataset({"x": x.tolist(), "y": y.tolist(), "corr": corr}, digits=3),
+            "xAxis": {"type": "category", "data": labels, "axisLabel": {"rotate": 45}},
+            "yAxis": {"type": "category", "data": labels},
             "visualMap": {
-                "show": True,
-                "min": min_price,
-                "max": max_price,
-                "dimension": 0,  # Use the first dimension (price) for visual mapping
-                "inRange": {
-                    "color": ['#37A2FF', '#80FFA5', '#FFBF00', '#FF0087', '#00DDFF'],  # Darker blue gradient
-                    "symbolSize": 10, # Adjust symbol size based on value
-                },
-                "calculable": True,
+                "min": -1,
+                "max": 1,
                 "orient": "horizontal",
                 "left": "center",
-                "bottom": "10%",
+                "bottom": "0%",
+                "calculable": True,
+                "inRange": {"color": ['#00DDFF', '#FFFFFF', '#FF0087']},
             },
-            "series": [
-                {
-                    "data": scatter_data,
-                    "type": "scatter",
-                    "symbolSize": 10,
-                    "itemStyle": {
-                        "color": "#08519c", # Darker default color
-                    },
-                    "emphasis": {
-                        "focus": "series",
-                        "itemStyle": {
-                            "color": "#FFD700",  # Highlight color on hover (Gold)
-                            "borderColor": "#FFD700", # Darker border color (Saddle Brown)
-                            "borderWidth": 2,
-                        },
-                    },
-                }
-            ],
+            "series": [{"name": "Correlation", "type": "heatmap", "seriesLayoutBy": "row", "encode": {"x": "x", "y": "y"}}],
         }
-
-        # Display the chart using st_echarts
-        st_echarts(options=options, height=f"{800}px")
+        st_echarts(options=options, height="500px", key="correlation")
+    elif len(stats.pairs) < 2:
+        st.warning("At least two currencies with data are needed for the Correlation Matrix.")
     else:
-        st.warning(f"No data available for {selected_currency} to display the Scatter Plot.")
-else:
-    st.warning("Please select a currency.")
\ No newline at end of file
+        st.warning(f"This range has only {bars} {selected_interval} bar(s) of change, too few for a correlation "
+                   "window of 2 or more; pick a longer date range or a finer interval.")
+
+if has_correlation:
+    with metrics.section("correlation_history", rows=stats.returns.size):
+        st.subheader(f"Rolling Correlation over Time ({window} bars)")
+        col_anchor, col_others = st.columns([0.3, 0.7])
+        with col_anchor:
+            anchor = st.selectbox("Correlation of", labels, key="corr_anchor")
+        row = labels.index(anchor)
+        # Most correlated pairs over the last window first
+        ranked = [labels[i] for i in np.argsort(-np.nan_to_num(np.abs(matrix[row]), nan=-1.0)) if i != row]
+        with col_others:
+            others = st.multiselect("With", ranked, default=ranked[:5], key=f"corr_with_{anchor}")
+        history = correlation.history(anchor)  # Every pair at every bar from running sums, one pass
+        step = max(1, history.shape[1] // DEFAULT_POINT_BUDGET)  # Thinned to the chart point budget
+        source = dataset({
+            "time": axis_times("all", selected_interval, stats.aligned.index[1::step]),
+            **{other: history[labels.index(other), ::step] for other in others},
+        }, digits=3)
+        options = {
+            "tooltip": {"trigger": "axis"},
+            "legend": {"data": others, "type": "scroll"},
+            "dataset": source,
+            "xAxis": {"type": "time", "name": "Date"},
+            "yAxis": {"type": "value", "name": "Correlation", "min": -1, "max": 1},
+            "series": [{"name": other, "type": "line", "showSymbol": False, "seriesLayoutBy": "row",
+                        "encode": {"x": "time", "y": other}} for other in others],
+        }
+        st_echarts(options=options, height="400px", key="correlation_history")
+
+# --- Debug Sidebar ------------------------------------------------------------------------------------------------------------------------------------
+# Written at the end of full reruns; fragment reruns update the totals and logs, not this sidebar
+if METRICS_FILE:
+    REGISTRY.write_prometheus(METRICS_FILE)
+if debug_mode:
+    profile_report = stop_profile(profiler) if profiler is not None else None
+    with st.sidebar.expander("Performance (last full rerun)", expanded=True):
+        sections = pd.DataFrame(metrics.table())
+        st.dataframe(sections, hide_index=True)
+        st.caption(f"Total {sections['seconds'].sum() * 1000:.0f} ms, {sections['payload_bytes'].sum() / 1024:.0f} KiB of chart options")
+        st.download_button("Sections (JSON lines)", sections.to_json(orient="records", lines=True), "sections.jsonl")
+        st.download_button("Prometheus metrics", REGISTRY.prometheus_text(), "dashboard.prom")
+        client = get_fetch_client()
+        latency = client.latency()
+        if latency:
+            st.caption(f"Upstream fetch p50 {latency[50] * 1000:.0f} ms, p99 {latency[99] * 1000:.0f} ms; "
+                       f"{client.attempts} attempts, {client.hedges} hedged, {client.failures} failed; circuit {client.breaker.state}")
+        if profile_report:
+            st.code(profile_report)
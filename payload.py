@@ -0,0 +1,81 @@
+"""
+Compact encoding of chart data for ``st_echarts`` options.
+
+Series are sent as column-major ECharts ``dataset`` sources (one row per dimension, shared
+by every series of the chart), timestamps as integer epoch milliseconds for ``time`` axes
+instead of repeated date strings, and floats rounded to the precision the charts display.
+"""
+
+import threading
+import zlib
+from collections import OrderedDict
+
+import numpy as np
+import pandas as pd
+
+# Decimal places kept for exchange rates (JPY/THB needs more than the 2 shown in the summary)
+PRICE_DIGITS = 5
+# Decimal places kept for change % values
+CHANGE_DIGITS = 4
+
+# Formatted axes kept in memory, shared by every session of the server process
+AXIS_CACHE_SIZE = 128
+_axis_cache = OrderedDict()
+_axis_lock = threading.Lock()
+
+
+def epoch_ms(index):
+    """Bar timestamps as integer epoch milliseconds, what an ECharts ``time`` axis expects."""
+    return np.asarray((index - pd.Timestamp(0, tz=index.tz)) // pd.Timedelta(milliseconds=1), dtype=np.int64).tolist()
+
+
+def rounded(values, digits=PRICE_DIGITS):
+    """Round to ``digits`` and turn NaN into ``None`` (JSON has no NaN, ECharts skips nulls)."""
+    values = np.round(np.asarray(values, dtype=float), digits)
+    out = values.tolist()
+    if np.isnan(values).any():
+        out = [None if v != v else v for v in out]
+    return out
+
+
+def dataset(rows, digits=PRICE_DIGITS):
+    """
+    Column-major ``dataset`` from ``{dimension name: values}``.
+
+    Series read it with ``"seriesLayoutBy": "row"`` and ``"encode": {"x": name, "y": name}``.
+    Lists that are already JSON-ready (e.g. epoch timestamps from ``epoch_ms``) are sent as-is.
+    """
+    source = []
+    for name, values in rows.items():
+        source.append([name] + (values if isinstance(values, list) else rounded(values, digits)))
+    return {"source": source, "sourceHeader": True}
+
+
+# --- Axis cache ---
+def index_fingerprint(index):
+    """Cheap identity of a DatetimeIndex: length, timezone and a checksum of the raw timestamps."""
+    return len(index), str(index.tz), zlib.crc32(np.ascontiguousarray(index.asi8).tobytes())
+
+
+def _cached_axis(key, build):
+    with _axis_lock:
+        if key in _axis_cache:
+            _axis_cache.move_to_end(key)
+            return _axis_cache[key]
+    value = build()
+    with _axis_lock:
+        _axis_cache[key] = value
+        while len(_axis_cache) > AXIS_CACHE_SIZE:
+            _axis_cache.popitem(last=False)
+    return value
+
+
+def axis_times(pair, interval, index):
+    """``epoch_ms(index)``, computed once per (pair, interval, index). Do not mutate the result."""
+    return _cached_axis(("times", pair, interval, index_fingerprint(index)), lambda: epoch_ms(index))
+
+
+def axis_labels(pair, interval, index):
+    """Date strings for a category axis, formatted once per (pair, interval, index). Do not mutate the result."""
+    fmt = "%Y-%m-%d" if interval in ("1d", "1wk") else "%Y-%m-%d %H:%M"
+    return _cached_axis(("labels", pair, interval, index_fingerprint(index)), lambda: index.strftime(fmt).tolist())
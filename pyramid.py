@@ -0,0 +1,116 @@
+"""
+Resample pyramid: daily and weekly bars derived from the hourly ones.
+
+Only the finest level (``1h``) is downloaded and stored; ``ResampledProvider`` builds the
+``1d`` and ``1wk`` bars from it locally (Open first, High max, Low min, Close last, Volume
+summed), so switching the sidebar interval neither refetches overlapping data nor needs a
+network connection once the hourly bars are on disk. Derived levels are cached per request
+and rebuilt only when the hourly bars under them change.
+
+Days start at local midnight of the session timezone (``EXCHANGE_SESSION_TZ``, the bars' own
+timezone by default, Europe/London for Yahoo FX), so DST days get their 23 or 25 hours, and
+weeks start on Monday like Yahoo's weekly bars. Yahoo serves hourly bars for the last 730 days
+only; older ranges are fetched at the requested interval directly.
+"""
+
+import os
+import threading
+from collections import OrderedDict
+from datetime import date, timedelta
+
+import numpy as np
+import pandas as pd
+
+from bar_store import _as_date
+from data_provider import OHLC_COLUMNS
+
+FINEST = "1h"
+LEVELS = ("1h", "1d", "1wk")
+# Days back the finest level can be fetched (Yahoo: 730 days of hourly bars)
+FINE_HISTORY_DAYS = int(os.environ.get("EXCHANGE_FINE_DAYS", "729"))
+# Timezone whose midnight starts a daily bar; None keeps the bars' own timezone
+SESSION_TZ = os.environ.get("EXCHANGE_SESSION_TZ") or None
+# Derived (ticker, interval, range) frames kept per provider
+PYRAMID_CACHE_SIZE = 256
+
+
+def bar_starts(index, interval, tz=SESSION_TZ):
+    """Start of the ``1h``/``1d``/``1wk`` bar every timestamp of a tz-aware ``index`` falls in."""
+    if tz is not None:
+        index = index.tz_convert(tz)
+    if interval == "1wk":
+        # Monday of the local calendar, stepped back on wall-clock days so a DST change mid-week doesn't shift it
+        days = index.tz_localize(None).normalize()
+        return (days - pd.to_timedelta(days.weekday, unit="D")).tz_localize(index.tz, ambiguous=True, nonexistent="shift_forward")
+    if interval == "1d":
+        return index.normalize()
+    # Floored on each bar's own UTC offset: a wall-clock floor can't tell the two 01:00 hours of a
+    # DST fall-back apart (pandas raises), and half-hour zones still get local hour boundaries
+    utc = index.tz_convert("UTC").tz_localize(None)
+    offsets = index.tz_localize(None) - utc
+    return ((utc + offsets).floor("h") - offsets).tz_localize("UTC").tz_convert(index.tz)
+
+
+def resample_bars(bars, interval, tz=SESSION_TZ):
+    """OHLC ``bars`` (sorted, unique index) aggregated into ``interval`` bars, in one pass."""
+    if bars.empty:
+        return bars
+    starts = bar_starts(bars.index, interval, tz)
+    codes = starts.asi8
+    first = np.flatnonzero(np.r_[True, codes[1:] != codes[:-1]])
+    last = np.r_[first[1:] - 1, len(codes) - 1]
+    column = {name: bars[name].to_numpy() for name in bars.columns}
+    aggregated = {
+        "Open": column["Open"][first],
+        "High": np.fmax.reduceat(column["High"].astype(float), first),
+        "Low": np.fmin.reduceat(column["Low"].astype(float), first),
+        "Close": column["Close"][last],
+    }
+    for name in ("Volume", "Dividends", "Stock Splits"):
+        if name in column:
+            aggregated[name] = np.add.reduceat(column[name], first)
+    return pd.DataFrame(aggregated, index=pd.DatetimeIndex(starts[first], name="Date"))[[c for c in OHLC_COLUMNS if c in aggregated]]
+
+
+class ResampledProvider:
+    """Provider wrapper serving ``1d``/``1wk`` requests from the wrapped provider's ``1h`` bars."""
+
+    def __init__(self, provider, fine_days=FINE_HISTORY_DAYS, cache_size=PYRAMID_CACHE_SIZE):
+        self.provider = provider
+        self.fine_days = fine_days
+        self.cache_size = cache_size
+        self.name = f"pyramid:{getattr(provider, 'name', 'provider')}"
+        self.derived = 0  # levels actually resampled, cache misses
+        self._cache = OrderedDict()
+        self._lock = threading.Lock()
+
+    def history(self, ticker, start=None, end=None, interval="1h", period=None):
+        if interval == FINEST or interval not in LEVELS or period is not None or start is None or end is None:
+            return self.provider.history(ticker, start=start, end=end, interval=interval, period=period)
+        start, end = _as_date(start), _as_date(end)
+        if start < date.today() - timedelta(days=self.fine_days):
+            return self.provider.history(ticker, start=start, end=end, interval=interval)
+
+        # Same hourly bars for every level, so a switch reads what the 1h view already stored.
+        # The first weekly bar therefore only covers the part of its week inside the range.
+        fine = self.provider.history(ticker, start=start, end=end, interval=FINEST)
+        if fine.empty:
+            return fine
+
+        key = (ticker, interval, start, end)
+        # The hourly bars only ever change at their end (new or still-moving bars)
+        fingerprint = (len(fine), fine.index[0], fine.index[-1], float(fine["Close"].iloc[-1]))
+        with self._lock:
+            cached = self._cache.get(key)
+            if cached is not None and cached[0] == fingerprint:
+                self._cache.move_to_end(key)
+                return cached[1]
+        bars = resample_bars(fine, interval)
+        with self._lock:
+            self.derived += 1
+            self._cache[key] = (fingerprint, bars)
+            self._cache.move_to_end(key)
+            while len(self._cache) > self.cache_size:
+                self._cache.popitem(last=False)
+        return bars
+
@@ -0,0 +1,120 @@
+"""
+Background refresh with stale-while-revalidate for the dashboard pages.
+
+One ``BackgroundRefresher`` per server process (held with ``st.cache_resource``) keeps the
+newest bars of every request any session asked for. Pages read the shared snapshot
+immediately; a single daemon thread re-fetches the requests on a fixed cadence, so upstream
+traffic stays at one poll loop however many dashboards are open.
+"""
+
+import itertools
+import os
+import threading
+import time
+from dataclasses import dataclass
+
+from compact import compact_frame
+from data_provider import fetch_all
+
+# Seconds between two polls of the same request
+DEFAULT_CADENCE = float(os.environ.get("EXCHANGE_REFRESH_SECONDS", "60"))
+# Requests nobody has read for this long are no longer polled
+DEFAULT_IDLE_AFTER = 15 * 60
+
+
+@dataclass(frozen=True)
+class Snapshot:
+    frames: dict  # ticker -> DataFrame, newest bars that were successfully fetched
+    fetched_at: dict  # ticker -> epoch seconds of the fetch those bars came from
+    version: int  # bumps whenever any frame changes, never repeats in a process: usable as a cache key
+
+    def age(self, ticker, now=None):
+        fetched = self.fetched_at.get(ticker)
+        return None if fetched is None else (now or time.time()) - fetched
+
+
+class _Entry:
+    def __init__(self, request):
+        self.request = request  # (tickers, start, end, interval, period)
+        self.lock = threading.Lock()
+        self.snapshot = None
+        self.polled_at = 0.0  # Tracked separately so failing pairs don't get polled every second
+        self.last_read = time.time()
+
+
+class BackgroundRefresher:
+    def __init__(self, provider, cadence=DEFAULT_CADENCE, idle_after=DEFAULT_IDLE_AFTER, dtype=None):
+        """``dtype``: keep the snapshot frames as read-only ``CompactBars`` OHLC frames of that type (see ``compact.py``)."""
+        self.provider = provider
+        self.dtype = dtype
+        self.cadence = cadence
+        self.idle_after = idle_after
+        self.polls = 0
+        self._entries = {}
+        # Shared by every entry, so a request evicted and asked for again never reuses a version
+        self._versions = itertools.count()
+        self._guard = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = None
+
+    def start(self):
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, name="exchange-refresher", daemon=True)
+            self._thread.start()
+        return self
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+
+    def get(self, tickers, start=None, end=None, interval="1h", period=None):
+        """Newest snapshot for the request, fetching synchronously only the very first time."""
+        tickers = tuple(tickers)
+        key = (tickers, start, end, interval, period)
+        with self._guard:
+            entry = self._entries.get(key)
+            if entry is None:
+                entry = self._entries[key] = _Entry(key)
+        entry.last_read = time.time()
+        if entry.snapshot is None:
+            with entry.lock:
+                if entry.snapshot is None:
+                    self._refresh(entry)
+        return entry.snapshot
+
+    # --- Poll loop ---
+    def _run(self):
+        while not self._stop.wait(min(self.cadence, 1.0)):
+            now = time.time()
+            with self._guard:
+                for key in [k for k, e in self._entries.items() if now - e.last_read > self.idle_after]:
+                    del self._entries[key]
+                due = [e for e in self._entries.values() if e.snapshot is not None and now - e.polled_at >= self.cadence]
+            for entry in due:
+                with entry.lock:
+                    try:
+                        self._refresh(entry)
+                    except Exception:
+                        # Keep polling; the page keeps serving the previous snapshot
+                        pass
+
+    def _refresh(self, entry):
+        tickers, start, end, interval, period = entry.request
+        frames = fetch_all(self.provider, tickers, start=start, end=end, interval=interval, period=period)
+        self.polls += 1
+        now = entry.polled_at = time.time()
+        old = entry.snapshot
+        merged, fetched_at = {}, {}
+        for ticker, frame in frames.items():
+            if frame.empty and old is not None and ticker in old.frames:
+                # Keep serving the last good bars, their timestamp shows how stale they are
+                merged[ticker], fetched_at[ticker] = old.frames[ticker], old.fetched_at[ticker]
+            else:
+                merged[ticker], fetched_at[ticker] = frame if self.dtype is None else compact_frame(frame, self.dtype), now
+        changed = old is None or any(not merged[t].equals(old.frames.get(t)) for t in merged)
+        if old is not None and not changed:
+            merged = old.frames  # Sessions keep reading the buffers they already have
+        version = next(self._versions) if changed else old.version
+        entry.snapshot = Snapshot(merged, fetched_at, version)
@@ -0,0 +1,221 @@
+"""
+Incremental rolling statistics of a pair's closes.
+
+A ``RollingStats`` keeps, for several windows at once (7/20/50/200 bars), Welford-style
+accumulators for the rolling mean/variance and monotonic deques for the rolling min/max, plus
+expanding totals (count/mean/variance/min/max) over the whole range. The first ``update``
+computes every window in one vectorised pass; later updates only fold in the bars appended
+since, O(1) per bar and window, instead of recomputing ``rolling(window).mean()`` over the full
+series on every rerun.
+
+The last bar of a frame is still open (a refresh or a streamed tick may change its close), so
+it is never committed to the accumulators: its values are derived from them on every read.
+"""
+
+import threading
+from collections import deque
+
+import numpy as np
+
+# Windows of the moving-average overlay
+DEFAULT_WINDOWS = (7, 20, 50, 200)
+
+
+class _Column:
+    """Growable float array, amortised O(1) appends."""
+
+    def __init__(self, values=()):
+        values = np.asarray(values, dtype=float)
+        self._data = np.empty(max(len(values) * 2, 64))
+        self._data[:len(values)] = values
+        self._size = len(values)
+
+    def append(self, value):
+        if self._size == len(self._data):
+            self._data = np.concatenate([self._data, np.empty(len(self._data))])
+        self._data[self._size] = value
+        self._size += 1
+
+    @property
+    def values(self):
+        return self._data[:self._size]
+
+
+class RollingWindow:
+    """Mean, variance, min and max of the last ``window`` committed values."""
+
+    def __init__(self, window):
+        self.window = window
+        self.values = deque()  # the values inside the window, oldest first
+        self.mean = 0.0
+        self.m2 = 0.0  # sum of squared deviations from the mean (Welford)
+        self._count = 0  # values ever committed, the position of the next one
+        self._min = deque()  # (position, value), values increasing
+        self._max = deque()  # (position, value), values decreasing
+
+    def seed(self, tail, count):
+        """Start from the last ``window`` values ``tail`` of ``count`` already committed ones."""
+        tail = np.asarray(tail, dtype=float)[-self.window:]
+        self.values = deque(tail.tolist())
+        self.mean = float(tail.mean()) if len(tail) else 0.0
+        self.m2 = float(((tail - self.mean) ** 2).sum())
+        self._count = count - len(tail)
+        self._min.clear()
+        self._max.clear()
+        for value in self.values:
+            self._push_extremes(value)
+            self._count += 1
+
+    def push(self, value):
+        if len(self.values) < self.window:
+            self.values.append(value)
+            delta = value - self.mean
+            self.mean += delta / len(self.values)
+            self.m2 += delta * (value - self.mean)
+        else:
+            # Sliding Welford: the oldest value leaves as the new one enters
+            old = self.values.popleft()
+            self.values.append(value)
+            mean = self.mean + (value - old) / self.window
+            self.m2 += (value - old) * (value - mean + old - self.mean)
+            self.mean = mean
+        self._push_extremes(value)
+        self._count += 1
+        first = self._count - self.window
+        if self._min[0][0] < first:
+            self._min.popleft()
+        if self._max[0][0] < first:
+            self._max.popleft()
+
+    def _push_extremes(self, value):
+        while self._min and self._min[-1][1] >= value:
+            self._min.pop()
+        self._min.append((self._count, value))
+        while self._max and self._max[-1][1] <= value:
+            self._max.pop()
+        self._max.append((self._count, value))
+
+    def peek(self, value):
+        """``(mean, std, min, max)`` of the window ending with one more, uncommitted ``value``."""
+        n = len(self.values)
+        if n < self.window:
+            count = n + 1
+            delta = value - self.mean
+            mean = self.mean + delta / count
+            m2 = self.m2 + delta * (value - mean)
+            first = self._count - n
+        else:
+            count = n
+            old = self.values[0]
+            mean = self.mean + (value - old) / n
+            m2 = self.m2 + (value - old) * (value - mean + old - self.mean)
+            first = self._count - n + 1
+        # The deque fronts hold the extremes of the committed window; only its oldest value leaves
+        low = next((v for position, v in self._min if position >= first), value)
+        high = next((v for position, v in self._max if position >= first), value)
+        std = np.sqrt(max(m2, 0.0) / (count - 1)) if count > 1 else np.nan
+        return mean, std, min(low, value), max(high, value)
+
+
+class RollingStats:
+    """Rolling and whole-range statistics of one close series, updated as bars are appended."""
+
+    def __init__(self, windows=DEFAULT_WINDOWS):
+        self.windows = tuple(windows)
+        self._lock = threading.Lock()
+        self._reset()
+
+    def _reset(self):
+        self.first_time = None
+        self.last_time = None  # last committed bar
+        self.committed = 0
+        self._rolling = {window: RollingWindow(window) for window in self.windows}
+        self._means = {window: _Column() for window in self.windows}
+        self._last = np.nan  # the open bar's close
+        # Expanding totals over every committed bar
+        self._count, self._mean, self._m2 = 0, 0.0, 0.0
+        self._low, self._high = np.inf, -np.inf
+
+    def update(self, index, closes):
+        """
+        Bring the accumulators up to date with the ``(DatetimeIndex, closes)`` of a pair's bars.
+
+        Bars after the last committed one are folded in; if the series no longer extends what was
+        committed (another range, revised history) everything is rebuilt in one pass.
+        """
+        closes = np.asarray(closes, dtype=float)
+        with self._lock:
+            n = len(closes)
+            extends = (self.first_time is not None and n > self.committed
+                       and index[0] == self.first_time and index[self.committed - 1] == self.last_time)
+            if not extends:
+                self._rebuild(index, closes)
+            else:
+                for value in closes[self.committed:n - 1]:
+                    self._commit(value)
+                if n - 1 > self.committed:
+                    self.committed = n - 1
+                    self.last_time = index[n - 2]
+            self._last = closes[-1] if n else np.nan
+        return self
+
+    def _rebuild(self, index, closes):
+        self._reset()
+        if len(closes) < 2:
+            self._last = closes[-1] if len(closes) else np.nan
+            return
+        committed = closes[:-1]
+        n = len(committed)
+        # Every window's rolling mean in one pass over the cumulative sum
+        cumsum = np.concatenate([[0.0], np.cumsum(committed)])
+        for window in self.windows:
+            means = np.full(n, np.nan)
+            if n >= window:
+                means[window - 1:] = (cumsum[window:] - cumsum[:-window]) / window
+            self._means[window] = _Column(means)
+            self._rolling[window].seed(committed, n)
+        self._count, self._mean = n, float(committed.mean())
+        self._m2 = float(((committed - self._mean) ** 2).sum())
+        self._low, self._high = float(committed.min()), float(committed.max())
+        self.first_time, self.last_time, self.committed = index[0], index[n - 1], n
+
+    def _commit(self, value):
+        for window in self.windows:
+            rolling = self._rolling[window]
+            rolling.push(value)
+            self._means[window].append(rolling.mean if len(rolling.values) == window else np.nan)
+        self._count += 1
+        delta = value - self._mean
+        self._mean += delta / self._count
+        self._m2 += delta * (value - self._mean)
+        self._low, self._high = min(self._low, value), max(self._high, value)
+
+    # --- Reads, the open bar included ---
+    def moving_average(self, window):
+        """Rolling mean of every bar, NaN until ``window`` bars are available (``rolling(window).mean()``)."""
+        with self._lock:
+            if np.isnan(self._last):
+                return self._means[window].values.copy()
+            rolling = self._rolling[window]
+            last = rolling.peek(self._last)[0] if len(rolling.values) + 1 >= window else np.nan
+            return np.append(self._means[window].values, last)
+
+    def window(self, window):
+        """``(mean, std, min, max)`` of the last ``window`` bars, NaN while fewer bars are available."""
+        with self._lock:
+            rolling = self._rolling[window]
+            if np.isnan(self._last) or len(rolling.values) + 1 < window:
+                return (np.nan,) * 4
+            return tuple(float(v) for v in rolling.peek(self._last))
+
+    def totals(self):
+        """``(count, mean, std, min, max)`` over every bar."""
+        with self._lock:
+            if np.isnan(self._last):
+                return self._count, np.nan, np.nan, np.nan, np.nan
+            count = self._count + 1
+            delta = self._last - self._mean
+            mean = self._mean + delta / count
+            m2 = self._m2 + delta * (self._last - mean)
+            std = np.sqrt(max(m2, 0.0) / (count - 1)) if count > 1 else np.nan
+            return count, float(mean), float(std), float(min(self._low, self._last)), float(max(self._high, self._last))
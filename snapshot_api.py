@@ -0,0 +1,344 @@
+"""
+Headless snapshot API: the Exchange Rate Summary numbers and the bars behind them over HTTP.
+
+Runs without Streamlit on the same data layer as the dashboard (``build_provider`` in
+data_provider.py: fetch client, on-disk bar store, archive, resample pyramid) and the same
+``BackgroundRefresher`` poll loop, so other systems read exactly what the page shows without
+rendering it::
+
+    python snapshot_api.py --port 8766
+    curl 'http://127.0.0.1:8766/stats?interval=1h&days=7'
+    curl 'http://127.0.0.1:8766/bars?pair=EUR/THB&start=2025-01-01&end=2025-02-01&format=arrow'
+
+``/stats`` has one row per pair (rate, change, change %, max, min, average, volatility, ...),
+``/bars?pair=`` its OHLC bars, ``/pairs`` the configured pairs. Windows are ``start``/``end``
+dates or the last ``days`` (7 by default, like the sidebar). ``format=arrow`` (or ``Accept:
+application/vnd.apache.arrow.stream``) answers in Arrow IPC stream format, which needs pyarrow.
+
+Responses are encoded once per snapshot version, not per request: a service thread rebuilds the
+statistics of every window someone asked for as soon as the refresher's data changes, and
+requests only look up the stored bytes. Every body has a strong ETag, so clients polling with
+``If-None-Match`` get a 304 without a body until the next change.
+"""
+
+import argparse
+import hashlib
+import json
+import logging
+import os
+import threading
+from collections import OrderedDict
+from datetime import date, timedelta
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+import numpy as np
+
+from compact import BAR_COLUMNS, DEFAULT_BAR_DTYPE
+from data_provider import build_provider
+from pyramid import LEVELS
+from refresher import BackgroundRefresher
+from stats import compute_stats
+from universe import load_universe
+
+logger = logging.getLogger("exchange_dashboard.api")
+
+DEFAULT_PORT = int(os.environ.get("EXCHANGE_API_PORT", "8766"))
+DEFAULT_DAYS = 7
+# Windows whose encoded snapshots are kept (the refresher drops the ones nobody reads)
+SNAPSHOT_CACHE_SIZE = 64
+ARROW_TYPE = "application/vnd.apache.arrow.stream"
+SUMMARY_FIELDS = ["latest_rate", "previous_rate", "daily_change", "daily_change_percent",
+                  "max_rate", "min_rate", "average_rate", "volatility", "count"]
+
+
+class RequestError(Exception):
+    def __init__(self, status, message):
+        super().__init__(message)
+        self.status = status
+
+
+# --- Encoding ---
+def _etag(body):
+    return '"' + hashlib.blake2b(body, digest_size=12).hexdigest() + '"'
+
+
+def _etag_matches(header, etag):
+    """``If-None-Match``: ``*`` or a comma-separated list of entity tags, compared weakly (``W/`` ignored) as RFC 9110 asks."""
+    tags = [tag.strip() for tag in header.split(",")]
+    return "*" in tags or etag in (tag[2:] if tag.startswith("W/") else tag for tag in tags)
+
+
+def _json(payload):
+    # NaN (no data yet) is not JSON; null is
+    return json.dumps(payload, separators=(",", ":"), allow_nan=False).encode()
+
+
+def _number(value):
+    return None if value is None or not np.isfinite(value) else float(value)
+
+
+def _oldest(times):
+    return None if not times or None in times else min(times)
+
+
+def _pyarrow():
+    try:
+        import pyarrow
+    except ImportError:
+        raise RequestError(406, "Arrow output needs pyarrow, ask for format=json") from None
+    return pyarrow
+
+
+def _arrow(columns):
+    """Arrow IPC stream of a ``{name: array}`` table."""
+    pa = _pyarrow()
+    table = pa.table(columns)
+    sink = pa.BufferOutputStream()
+    with pa.ipc.new_stream(sink, table.schema) as writer:
+        writer.write_table(table)
+    return sink.getvalue().to_pybytes()
+
+
+class _Window:
+    """Encoded responses of one (start, end, interval) window at one snapshot version."""
+
+    def __init__(self, request, snapshot, universe):
+        self.request = request
+        self.version = snapshot.version
+        self.frames = universe.frames(snapshot.frames, universe.triangulator(snapshot.frames))
+        self.stats = compute_stats(self.frames)
+        # Epoch seconds of a pair's oldest leg, like the "Updated" column
+        self.fetched_at = {pair.name: _oldest([snapshot.fetched_at.get(ticker) for ticker in pair.tickers]) for pair in universe.pairs}
+        self.bodies = {}  # (resource, pair, format) -> (body, etag)
+        self.lock = threading.Lock()
+
+    def body(self, resource, pair, fmt):
+        key = (resource, pair, fmt)
+        cached = self.bodies.get(key)
+        if cached is None:
+            with self.lock:
+                cached = self.bodies.get(key)
+                if cached is None:
+                    body = self._encode(resource, pair, fmt)
+                    cached = self.bodies[key] = (body, _etag(body))
+        return cached
+
+    def _encode(self, resource, pair, fmt):
+        start, end, interval = self.request
+        if resource == "stats":
+            names = list(self.stats.currencies)
+            rows = [self.stats.pairs.get(name) for name in names]
+            columns = {field: [None if row is None else _number(getattr(row, field)) for row in rows] for field in SUMMARY_FIELDS}
+            columns["count"] = [None if row is None else row.count for row in rows]
+            if fmt == "arrow":
+                return _arrow({"pair": names, **columns, "fetched_at": [self.fetched_at[name] for name in names]})
+            return _json({
+                "start": start.isoformat(), "end": end.isoformat(), "interval": interval, "version": self.version,
+                "pairs": [{"pair": name, **{field: columns[field][i] for field in SUMMARY_FIELDS}, "fetched_at": self.fetched_at[name]}
+                          for i, name in enumerate(names)],
+            })
+
+        frame = self.frames[pair]
+        if frame.empty:
+            times, values, tz = np.empty(0, dtype=np.int64), np.empty((0, 4)), "UTC"
+        else:
+            index = frame.index
+            times, values, tz = index.as_unit("ns").asi8, frame[BAR_COLUMNS].to_numpy(dtype=float), str(index.tz or "UTC")
+        if fmt == "arrow":
+            pa = _pyarrow()
+            return _arrow({"time": pa.array(times, pa.timestamp("ns", tz)), **{c: values[:, i] for i, c in enumerate(BAR_COLUMNS)}})
+        return _json({
+            "pair": pair, "start": start.isoformat(), "end": end.isoformat(), "interval": interval, "version": self.version,
+            "tz": tz, "times": (times // 1_000_000).tolist(),  # epoch milliseconds, like the chart payloads
+            "columns": BAR_COLUMNS, "values": [[_number(v) for v in row] for row in values.tolist()],
+        })
+
+
+class SnapshotService:
+    def __init__(self, refresher, universe, cache_size=SNAPSHOT_CACHE_SIZE, rebuild_every=1.0):
+        self.refresher = refresher
+        self.universe = universe
+        self.cache_size = cache_size
+        self.rebuild_every = rebuild_every
+        self.builds = 0  # windows encoded, once per snapshot version
+        self._windows = OrderedDict()  # (start, end, interval) -> _Window
+        self._guard = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = None
+
+    def start(self):
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, name="exchange-snapshots", daemon=True)
+            self._thread.start()
+        return self
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+
+    def window(self, start, end, interval):
+        """Encoded snapshot of a window, rebuilt here only the first time or if the service thread is behind."""
+        request = (start, end, interval)
+        snapshot = self.refresher.get(self.universe.tickers, start, end, interval=interval)
+        with self._guard:
+            window = self._windows.get(request)
+            if window is not None:
+                self._windows.move_to_end(request)
+        if window is None or window.version != snapshot.version:
+            window = self._rebuild(request, snapshot)
+        return window
+
+    def _rebuild(self, request, snapshot):
+        window = _Window(request, snapshot, self.universe)
+        window.body("stats", None, "json")  # The common request is ready before anyone asks
+        with self._guard:
+            current = self._windows.get(request)
+            if current is not None and current.version >= window.version:
+                return current  # Another thread got there first
+            self.builds += 1
+            self._windows[request] = window
+            self._windows.move_to_end(request)
+            while len(self._windows) > self.cache_size:
+                self._windows.popitem(last=False)
+        return window
+
+    def _run(self):
+        while not self._stop.wait(self.rebuild_every):
+            with self._guard:
+                windows = list(self._windows.values())
+            for window in windows:
+                start, end, interval = window.request
+                try:
+                    snapshot = self.refresher.get(self.universe.tickers, start, end, interval=interval)
+                    if snapshot.version != window.version:
+                        self._rebuild(window.request, snapshot)
+                except Exception:
+                    # Requests keep getting the previous version
+                    logger.exception("Rebuilding the snapshot of %s %s..%s failed", interval, start, end)
+
+    # --- Requests ---
+    def respond(self, path, query, accept=""):
+        """``(status, content type, body, etag)`` of a GET request."""
+        if path == "/health":
+            return 200, "application/json", _json({"ok": True, "windows": len(self._windows), "builds": self.builds}), None
+        if path == "/pairs":
+            body = _json({"pivot": self.universe.pivot, "pairs": self.universe.names})
+            return 200, "application/json", body, _etag(body)
+        if path not in ("/stats", "/bars"):
+            raise RequestError(404, f"Unknown path {path}, try /stats, /bars or /pairs")
+
+        fmt = query.get("format") or ("arrow" if ARROW_TYPE in accept else "json")
+        if fmt not in ("json", "arrow"):
+            raise RequestError(400, "format must be json or arrow")
+        pair = query.get("pair") if path == "/bars" else None
+        if path == "/bars" and pair not in self.universe.names:
+            raise RequestError(404, f"Unknown pair {pair!r}, see /pairs")
+        body, etag = self.window(*_window(query)).body(path[1:], pair, fmt)
+        return 200, ARROW_TYPE if fmt == "arrow" else "application/json", body, etag
+
+
+def _window(query):
+    interval = query.get("interval", "1h")
+    if interval not in LEVELS:
+        raise RequestError(400, f"interval must be one of {', '.join(LEVELS)}")
+    try:
+        end = date.fromisoformat(query["end"]) if "end" in query else date.today()
+        start = date.fromisoformat(query["start"]) if "start" in query else end - timedelta(days=int(query.get("days", DEFAULT_DAYS)))
+    except (ValueError, OverflowError) as exc:  # bad dates, or days beyond the calendar
+        raise RequestError(400, str(exc)) from None
+    if start >= end:
+        raise RequestError(400, "start must be before end")
+    return start, end, interval
+
+
+# --- HTTP server ---
+class SnapshotServer:
+    def __init__(self, service, host="127.0.0.1", port=DEFAULT_PORT):
+        self.service = service
+        self._server = ThreadingHTTPServer((host, port), self._handler())
+        self._server.daemon_threads = True
+        self._thread = None
+
+    @property
+    def url(self):
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def start(self):
+        self.service.start()
+        self._thread = threading.Thread(target=self._server.serve_forever, name="exchange-api", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._server.shutdown()
+        self._server.server_close()
+        self.service.stop()
+
+    def serve_forever(self):
+        self.service.start()
+        self._server.serve_forever()
+
+    def _handler(self):
+        service = self.service
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"  # Keep-alive, pollers reuse their connection
+            disable_nagle_algorithm = True  # Headers and body go out as two writes; don't hold the body for an ACK
+
+            def do_GET(self):
+                url = urlparse(self.path)
+                query = {k: v[0] for k, v in parse_qs(url.query).items()}
+                try:
+                    status, content_type, body, etag = service.respond(url.path, query, self.headers.get("Accept", ""))
+                except RequestError as exc:
+                    status, content_type, body, etag = exc.status, "application/json", _json({"error": str(exc)}), None
+                except Exception:
+                    # Answer anyway: a dropped connection tells the client nothing
+                    logger.exception("GET %s failed", self.path)
+                    status, content_type, body, etag = 500, "application/json", _json({"error": "internal error"}), None
+                if etag is not None and _etag_matches(self.headers.get("If-None-Match", ""), etag):
+                    self.send_response(304)
+                    self.send_header("ETag", etag)
+                    self.send_header("Content-Length", "0")
+                    self.end_headers()
+                    return
+                self.send_response(status)
+                self.send_header("Content-Type", content_type)
+                self.send_header("Content-Length", str(len(body)))
+                if etag is not None:
+                    self.send_header("ETag", etag)
+                    self.send_header("Cache-Control", "no-cache")  # Cache, but revalidate: a refresh can land any minute
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                pass
+
+        return Handler
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=DEFAULT_PORT, help=f"EXCHANGE_API_PORT, default {DEFAULT_PORT}")
+    args = parser.parse_args(argv)
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s %(name)s: %(message)s")
+    # Same pairs and EXCHANGE_* settings as main.py, but its own refresher: this is a separate process
+    universe = load_universe()
+    if os.environ.get("EXCHANGE_PAIRS"):
+        universe = universe.select(os.environ["EXCHANGE_PAIRS"].split(","))
+    refresher = BackgroundRefresher(build_provider(), dtype=DEFAULT_BAR_DTYPE).start()
+    server = SnapshotServer(SnapshotService(refresher, universe), args.host, args.port)
+    print(f"Serving exchange rate snapshots on {server.url}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,171 @@
+"""
+Per-pair statistics shared by every dashboard panel.
+
+``compute_stats`` runs once per data refresh: the close series of all pairs are joined into
+one aligned matrix (see ``aligned.py``) and the summary numbers (max/min/mean/std/quartiles)
+come out of a single pass over the bars each pair actually printed. Panels read the resulting
+``DashboardStats`` instead of recomputing ``pct_change()``, ``max()``, ``std()`` ... on the
+raw frames.
+"""
+
+from dataclasses import dataclass
+
+import numpy as np
+import pandas as pd
+
+from aligned import DEFAULT_FILL_LIMIT, AlignedCloses, align_closes, change_percent
+
+
+@dataclass(frozen=True)
+class PairStats:
+    latest_rate: float
+    previous_rate: float
+    daily_change: float
+    daily_change_percent: float
+    max_rate: float
+    min_rate: float
+    average_rate: float
+    volatility: float
+    q1: float
+    median: float
+    q3: float
+    count: int
+
+
+@dataclass(frozen=True)
+class DashboardStats:
+    currencies: tuple  # every requested pair, in display order
+    pairs: dict  # currency -> PairStats, only pairs that returned data
+    summary: pd.DataFrame  # one row per pair, columns are the PairStats fields
+    aligned: AlignedCloses  # closes of every pair with data on one shared index
+    returns: np.ndarray  # (pairs, bars) change % of ``aligned.close``, first bar set to 0
+    change_min: float  # bounds over all pairs' changes, first bar excluded
+    change_max: float
+
+    def observed_returns(self):
+        """``returns`` without the forward-filled bars: NaN wherever the pair printed no bar of its own."""
+        return np.where(self.aligned.observed, self.returns, np.nan)
+
+    @property
+    def all_available(self):
+        return len(self.pairs) == len(self.currencies) and len(self.pairs) > 0
+
+
+def compute_stats(exchange_data, fill_limit=DEFAULT_FILL_LIMIT, rolling=None):
+    """
+    ``rolling`` maps each pair to its up-to-date ``RollingStats`` (see ``rolling.py``); when given,
+    max/min/mean/std/count come from their incremental totals instead of a pass over the bars.
+    """
+    currencies = tuple(exchange_data)
+    aligned = align_closes(exchange_data, fill_limit)
+    if not aligned.pairs:
+        return DashboardStats(currencies, {}, pd.DataFrame(columns=list(PairStats.__dataclass_fields__)), aligned,
+                              np.empty((0, 0)), -1.0, 1.0)
+
+    # Summary numbers only look at the bars a pair printed itself, never the filled ones
+    raw = aligned.raw()
+    wide = pd.DataFrame(raw.T, index=aligned.index, columns=list(aligned.pairs))
+    if rolling is not None and all(pair in rolling for pair in aligned.pairs):
+        totals = np.array([rolling[pair].totals() for pair in aligned.pairs], dtype=float)
+        summary = pd.DataFrame(totals, index=list(aligned.pairs), columns=["count", "average_rate", "volatility", "min_rate", "max_rate"])
+    else:
+        summary = pd.DataFrame({
+            "max_rate": wide.max(),
+            "min_rate": wide.min(),
+            "average_rate": wide.mean(),
+            "volatility": wide.std(),
+            "count": wide.count(),
+        })
+    quartiles = wide.quantile([0.25, 0.5, 0.75])
+    summary["q1"], summary["median"], summary["q3"] = quartiles.iloc[0], quartiles.iloc[1], quartiles.iloc[2]
+
+    # Latest / previous bar of each pair's own series
+    tails = np.array([_last_two(values[observed]) for values, observed in zip(raw, aligned.observed)])
+    summary["latest_rate"] = tails[:, 1]
+    summary["previous_rate"] = tails[:, 0]
+    summary["daily_change"] = summary["latest_rate"] - summary["previous_rate"]
+    previous = summary["previous_rate"].where(summary["previous_rate"] != 0)
+    summary["daily_change_percent"] = (summary["daily_change"] / previous * 100).fillna(0)
+    summary = summary[list(PairStats.__dataclass_fields__)]
+
+    # Change % of every pair on the shared index in one pass; the visualMap bounds come from
+    # the same matrix, before the first bar is set to 0
+    returns = change_percent(aligned.close)
+    change_min, change_max = value_bounds(returns)
+    returns[:, 0] = 0  # No change for the first bar
+
+    pairs = {currency: PairStats(**{k: (int(v) if k == "count" else float(v)) for k, v in row.items()})
+             for currency, row in summary.iterrows()}
+    # Shared by every session (st.cache_resource), so nobody may write into the matrices
+    for array in (aligned.close, aligned.observed, returns):
+        array.setflags(write=False)
+    return DashboardStats(currencies, pairs, summary, aligned, returns, change_min, change_max)
+
+
+def _last_two(values):
+    latest = values[-1]
+    previous = values[-2] if len(values) >= 2 else latest
+    return previous, latest
+
+
+# --- Radar chart ---
+RADAR_METRICS = ["volatility", "daily_change_percent", "average_rate", "max_rate", "min_rate"]
+RADAR_INDICATORS = ["Volatility", "Daily Change %", "Average Rate", "Max Rate", "Min Rate"]
+# Padding when widening each indicator's bounds; a 0 factor keeps that bound pinned at 0
+_RADAR_MAX_PADDING = np.array([1.1, 1.1, 1.1, 1.1, 1.1])
+_RADAR_MIN_PADDING = np.array([0.0, 1.1, 0.9, 0.0, 0.9])
+
+
+def radar_indicators(values):
+    """
+    Indicator bounds for an ``(n_pairs, 5)`` array of radar metrics, in one pass over all pairs.
+
+    Bounds start at 0 and widen to the padded metric values; an indicator whose range is still
+    empty after the first pair gets ``min = -1`` so ECharts always has ``min < max``.
+    """
+    values = np.asarray(values, dtype=float).reshape(-1, len(RADAR_INDICATORS))
+    # fmax/fmin skip NaN metrics (e.g. the volatility of a single bar)
+    highs = np.fmax.reduce(values * _RADAR_MAX_PADDING, axis=0, initial=0.0)
+    lows = np.fmin.reduce(values * _RADAR_MIN_PADDING, axis=0, initial=0.0)
+    if len(values):
+        first_high = np.fmax(values[0] * _RADAR_MAX_PADDING, 0.0)
+        first_low = np.fmin(values[0] * _RADAR_MIN_PADDING, 0.0)
+        lows = np.where((first_high == 0) & (first_low == 0), np.minimum(lows, -1.0), lows)
+    return [{"name": name, "max": float(hi), "min": float(lo)} for name, hi, lo in zip(RADAR_INDICATORS, highs, lows)]
+
+
+def radar_chart_data(stats):
+    """``(indicator, radar_data)`` for the ECharts radar series of every available pair."""
+    currencies = [currency for currency in stats.currencies if currency in stats.pairs]
+    values = stats.summary.loc[currencies, RADAR_METRICS].to_numpy(dtype=float)
+    radar_data = [{"value": row.tolist(), "name": currency} for currency, row in zip(currencies, values)]
+    return radar_indicators(values), radar_data
+
+
+# --- Heatmap ---
+WEEKDAYS = ["Mon", "Tue", "Wed", "Thu", "Fri", "Sat", "Sun"]
+
+
+def heatmap_cells(matrix):
+    """``(x, y, value)`` columns for every cell of an ``(x, y)`` matrix, column by column."""
+    matrix = np.asarray(matrix, dtype=float)
+    n_x, n_y = matrix.shape
+    return np.tile(np.arange(n_x), n_y), np.repeat(np.arange(n_y), n_x), matrix.T.ravel()
+
+
+def hour_weekday_means(returns, index):
+    """Mean change % of a ``(pairs, bars)`` matrix per (hour of day, weekday) as a ``(24, 7)`` array, NaN where no bar falls."""
+    codes = np.broadcast_to(np.asarray(index.hour) * 7 + np.asarray(index.weekday), returns.shape)
+    valid = ~np.isnan(returns)
+    sums = np.bincount(codes[valid], weights=returns[valid], minlength=24 * 7)
+    counts = np.bincount(codes[valid], minlength=24 * 7)
+    with np.errstate(invalid="ignore"):
+        return (sums / counts).reshape(24, 7)
+
+
+def value_bounds(values, default=(-1.0, 1.0)):
+    """``(min, max)`` ignoring NaN, ``default`` when nothing is left."""
+    values = np.asarray(values, dtype=float)
+    if np.isnan(values).all():
+        return default
+    return float(np.nanmin(values)), float(np.nanmax(values))
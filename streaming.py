@@ -0,0 +1,267 @@
+"""
+Streaming quotes for the live views.
+
+A feed adapter pushes ``(ticker, epoch ns, price)`` ticks into a ``TickHub``, which keeps the
+newest ``capacity`` ticks of every pair in a fixed-size ring buffer. Pages read the latest
+price, or fold the ticks into the last bar of their history with ``live_bars``, without
+refetching history.
+
+Feeds:
+
+* ``ReplayFeed``: replays recorded bars (Open -> High -> Low -> Close of every bar) as ticks
+  stamped with the current time, at any tick rate, for offline runs and load tests.
+* ``YahooFeed``: Yahoo Finance's streaming websocket (``yfinance.WebSocket``).
+
+``EXCHANGE_STREAM=replay|yahoo`` turns streaming on for the dashboards.
+"""
+
+import os
+import threading
+import time
+from datetime import date, timedelta
+
+import numpy as np
+import pandas as pd
+
+from pyramid import bar_starts
+
+# Ticks kept per pair
+DEFAULT_CAPACITY = 4096
+# Ticks per second each pair gets from a ReplayFeed unless told otherwise
+DEFAULT_REPLAY_RATE = float(os.environ.get("EXCHANGE_STREAM_RATE", "5"))
+# Seconds between two reads of the hub by the live panels
+DEFAULT_REFRESH = float(os.environ.get("EXCHANGE_STREAM_REFRESH", "1"))
+
+
+# --- Ring buffer ---
+class RingBuffer:
+    """Newest ``capacity`` (epoch ns, price) ticks in two preallocated arrays; appends never allocate."""
+
+    def __init__(self, capacity=DEFAULT_CAPACITY):
+        self.capacity = capacity
+        self._times = np.zeros(capacity, dtype=np.int64)
+        self._prices = np.zeros(capacity, dtype=np.float64)
+        self._count = 0  # ticks ever appended; the next write goes to _count % capacity
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return min(self._count, self.capacity)
+
+    @property
+    def count(self):
+        return self._count
+
+    def append(self, time_ns, price):
+        with self._lock:
+            slot = self._count % self.capacity
+            self._times[slot] = time_ns
+            self._prices[slot] = price
+            self._count += 1
+
+    def latest(self):
+        """``(epoch ns, price)`` of the newest tick, ``None`` before the first one."""
+        with self._lock:
+            if not self._count:
+                return None
+            slot = (self._count - 1) % self.capacity
+            return int(self._times[slot]), float(self._prices[slot])
+
+    def since(self, time_ns=None):
+        """Copies of the buffered ``(times, prices)`` in arrival order, only those at or after ``time_ns``."""
+        with self._lock:
+            n = len(self)
+            start = self._count % self.capacity if self._count > self.capacity else 0
+            order = (np.arange(n) + start) % self.capacity
+            times, prices = self._times[order], self._prices[order]
+        if time_ns is not None:
+            keep = times >= time_ns
+            times, prices = times[keep], prices[keep]
+        return times, prices
+
+
+class TickHub:
+    """One ring buffer per ticker, fed by a feed adapter and read by any number of sessions."""
+
+    def __init__(self, capacity=DEFAULT_CAPACITY):
+        self.capacity = capacity
+        self.ticks = 0
+        self._buffers = {}
+        self._guard = threading.Lock()
+        self._feed = None
+
+    def buffer(self, ticker):
+        with self._guard:
+            buffer = self._buffers.get(ticker)
+            if buffer is None:
+                buffer = self._buffers[ticker] = RingBuffer(self.capacity)
+            return buffer
+
+    def push(self, ticker, time_ns, price):
+        self.buffer(ticker).append(time_ns, price)
+        self.ticks += 1
+
+    def latest(self, ticker):
+        with self._guard:
+            buffer = self._buffers.get(ticker)
+        return None if buffer is None else buffer.latest()
+
+    def attach(self, feed):
+        """Start ``feed`` pushing into this hub (replacing the previous one)."""
+        if self._feed is not None:
+            self._feed.stop()
+        self._feed = feed
+        feed.start(self.push)
+        return self
+
+    def close(self):
+        if self._feed is not None:
+            self._feed.stop()
+            self._feed = None
+
+
+# --- Folding ticks into bars ---
+def _bar_starts(times_ns, interval, tz):
+    return bar_starts(pd.DatetimeIndex(pd.to_datetime(times_ns, utc=True)).tz_convert(tz), interval, tz)
+
+
+def live_bars(bars, buffer, interval="1h"):
+    """
+    ``bars`` with the buffered ticks folded in: ticks in the last bar's period extend its
+    High/Low/Close, later ticks open new bars. Ticks older than the last bar are ignored.
+    """
+    if bars.empty or buffer is None:
+        return bars
+    last_start = bars.index[-1]
+    times, prices = buffer.since(last_start.value)
+    if not len(times):
+        return bars
+
+    starts = _bar_starts(times, interval, bars.index.tz)
+    ticks = pd.DataFrame({"price": prices}, index=starts)
+    grouped = ticks.groupby(level=0, sort=True)["price"]
+    live = pd.DataFrame({"Open": grouped.first(), "High": grouped.max(), "Low": grouped.min(), "Close": grouped.last()})
+    live = live[live.index >= last_start]
+    if live.empty:
+        return bars
+
+    bars = bars.copy()
+    if live.index[0] == last_start:
+        first = live.iloc[0]
+        bars.iloc[-1, bars.columns.get_loc("High")] = max(bars["High"].iloc[-1], first["High"])
+        bars.iloc[-1, bars.columns.get_loc("Low")] = min(bars["Low"].iloc[-1], first["Low"])
+        bars.iloc[-1, bars.columns.get_loc("Close")] = first["Close"]
+        live = live.iloc[1:]
+    if not live.empty:
+        live.index.name = bars.index.name
+        bars = pd.concat([bars, live.reindex(columns=bars.columns, fill_value=0)])
+    return bars
+
+
+# --- Feeds ---
+class ReplayFeed:
+    """Replays recorded ``{ticker: OHLC DataFrame}`` bars as live ticks, ``rate`` ticks per second per pair."""
+
+    def __init__(self, frames, rate=DEFAULT_REPLAY_RATE, loop=True):
+        # Open -> High -> Low -> Close inside every bar, a plausible intra-bar path, scaled so it
+        # continues from the last recorded close instead of jumping back to the first bar's level
+        self.paths = {}
+        for ticker, frame in frames.items():
+            if not frame.empty:
+                path = frame[["Open", "High", "Low", "Close"]].to_numpy(dtype=float).ravel()
+                self.paths[ticker] = path * (path[-1] / path[0])
+        self.rate = rate
+        self.loop = loop
+        self.sent = 0
+        self._stop = threading.Event()
+        self._thread = None
+
+    @classmethod
+    def from_provider(cls, provider, tickers, days=7, interval="1h", **kwargs):
+        from data_provider import fetch_all
+
+        end_date = date.today() + timedelta(days=1)
+        return cls(fetch_all(provider, tickers, start=end_date - timedelta(days=days), end=end_date, interval=interval), **kwargs)
+
+    def start(self, push):
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, args=(push,), name="exchange-replay", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+
+    def _run(self, push):
+        step = 0
+        period = 1.0 / self.rate if self.rate > 0 else 0.0
+        next_at = time.perf_counter()
+        while not self._stop.is_set():
+            now_ns = time.time_ns()
+            active = False
+            for ticker, path in self.paths.items():
+                if step < len(path) or self.loop:
+                    push(ticker, now_ns, path[step % len(path)])
+                    self.sent += 1
+                    active = True
+            if not active:
+                return
+            step += 1
+            if period:
+                next_at += period
+                delay = next_at - time.perf_counter()
+                if delay > 0:
+                    self._stop.wait(delay)
+
+
+class YahooFeed:
+    """Live quotes from Yahoo Finance's streaming websocket."""
+
+    def __init__(self, tickers):
+        self.tickers = list(tickers)
+        self._socket = None
+        self._thread = None
+
+    def start(self, push):
+        import yfinance as yf  # Only streaming deployments need it
+
+        def on_message(message):
+            if message.get("id") in self.tickers and message.get("price") is not None:
+                push(message["id"], int(message.get("time") or time.time() * 1000) * 1_000_000, float(message["price"]))
+
+        self._socket = yf.WebSocket()
+        self._socket.subscribe(self.tickers)
+        self._thread = threading.Thread(target=self._socket.listen, args=(on_message,), name="exchange-yahoo-feed", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        if self._socket is not None:
+            self._socket.close()
+            self._socket = None
+
+
+def live_price(pair, hub):
+    """Latest streamed price of a universe ``Pair``, derived from its legs' ticks for crosses; ``None`` without ticks."""
+    if pair.ticker:
+        latest = hub.latest(pair.ticker)
+        return None if latest is None else latest[1]
+    prices = [1.0 if leg is None else hub.latest(leg) for leg in pair.legs]
+    if any(price is None for price in prices):
+        return None
+    base, quote = (price if isinstance(price, float) else price[1] for price in prices)
+    return base / quote
+
+
+def stream_mode():
+    return os.environ.get("EXCHANGE_STREAM", "").lower()
+
+
+def start_feed(hub, tickers, provider=None, mode=None):
+    """Attach the ``EXCHANGE_STREAM`` feed for ``tickers`` to ``hub``; replay builds its bars from ``provider``."""
+    mode = mode or stream_mode()
+    if mode == "replay":
+        return hub.attach(ReplayFeed.from_provider(provider, tickers))
+    if mode == "yahoo":
+        return hub.attach(YahooFeed(tickers))
+    raise ValueError(f"Unknown stream mode: {mode}")
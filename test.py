@@ -1,4 +1,3 @@
-import yfinance as yf
 import streamlit as st
 
 # ตั้งค่าหน้าเว็บ
@@ -33,38 +32,68 @@ st.markdown(
     unsafe_allow_html=True
 )
 
-# รายชื่อสกุลเงินที่ต้องการดึงข้อมูล
-currencies = {
-    "EUR/THB": "EURTHB=X",
-    "JPY/THB": "JPYTHB=X",
-    "GBP/THB": "GBPTHB=X",
-    "CNY/THB": "CNYTHB=X",
-    "USD/THB": "USDTHB=X"
-}
+# โหลดโมดูลข้อมูล (pandas/numpy) หลังจากส่งหน้าเว็บและ CSS ออกไปแล้ว เพื่อให้ worker ใหม่แสดงหน้าได้ทันที
+from data_provider import get_provider
+from fetch_client import FetchClient
+from refresher import BackgroundRefresher
+from universe import load_universe
+from streaming import DEFAULT_REFRESH, TickHub, live_price, start_feed, stream_mode
 
-# ดึงข้อมูลราคาล่าสุด
-exchange_rates = {}
+# รายชื่อสกุลเงินที่ต้องการดึงข้อมูล (รายการ "board" ใน currencies.json)
+universe = load_universe(key="board")
 
-for currency, ticker in currencies.items():
-    data = yf.Ticker(ticker)
-    hist = data.history(period="1d")  # ดึงข้อมูลย้อนหลัง 1 วัน
-    
-    if not hist.empty:
-        exchange_rates[currency] = f"{hist['Close'].iloc[-1]:.2f}"  # จัดรูปแบบทศนิยม 2 ตำแหน่ง
-    else:
-        exchange_rates[currency] = "N/A"
+# ตัวดึงข้อมูลเบื้องหลัง ใช้ร่วมกันทุก session (ดึงข้อมูลจาก upstream แค่ลูปเดียว)
+@st.cache_resource
+def get_refresher():
+    return BackgroundRefresher(FetchClient(get_provider())).start()  # มี timeout/retry/circuit breaker ระหว่างดึงข้อมูล
 
-# จัดกล่องให้อยู่ในแนวนอน
-cols = st.columns(len(currencies))
+# โหมดสตรีม (EXCHANGE_STREAM=replay|yahoo): feed เดียวต่อ process เติมราคาล่าสุดลง ring buffer ของแต่ละคู่
+@st.cache_resource
+def get_tick_hub(tickers):
+    return start_feed(TickHub(), tickers, get_provider())
 
-# วนลูปแสดงข้อมูลแต่ละค่า
-for i, (currency, rate) in enumerate(exchange_rates.items()):
-    with cols[i]:  # แสดงแต่ละค่าในคอลัมน์ของตัวเอง
-        st.markdown(
-            f"""    
-            <div class="rate-box">
-                {rate} <br>THB
-            </div>
-            """,
-            unsafe_allow_html=True
-        )
\ No newline at end of file
+# ดึงข้อมูลราคาล่าสุด (อ่านจาก snapshot ล่าสุดทันที ไม่ต้องรอ upstream)
+with st.spinner("กำลังโหลดอัตราแลกเปลี่ยน..."):
+    snapshot = get_refresher().get(universe.tickers, interval="1d", period="1d")  # ดึงข้อมูลย้อนหลัง 1 วัน ทุกคู่พร้อมกัน
+frames = universe.frames(snapshot.frames)
+
+# โหมดสตรีมรันเฉพาะส่วนนี้ซ้ำทุก DEFAULT_REFRESH วินาที ไม่ต้องรันทั้งสคริปต์
+@st.fragment(run_every=DEFAULT_REFRESH if stream_mode() else None)
+def rate_boxes():
+    exchange_rates = {}
+    updated = {}
+    hub = get_tick_hub(universe.tickers) if stream_mode() else None
+
+    for currency, hist in frames.items():
+        price = live_price(universe.pair(currency), hub) if hub is not None else None
+        if price is not None:
+            exchange_rates[currency] = f"{price:.2f}"
+            updated[currency] = "สด (สตรีม)"
+            continue
+
+        age = universe.age(snapshot, currency)
+        updated[currency] = f"อัปเดต {age:.0f} วินาทีที่แล้ว"
+
+        if not hist.empty:
+            exchange_rates[currency] = f"{hist['Close'].iloc[-1]:.2f}"  # จัดรูปแบบทศนิยม 2 ตำแหน่ง
+        else:
+            exchange_rates[currency] = "N/A"
+
+    # จัดกล่องให้อยู่ในแนวนอน
+    cols = st.columns(len(universe.pairs))
+
+    # วนลูปแสดงข้อมูลแต่ละค่า
+    for i, (currency, rate) in enumerate(exchange_rates.items()):
+        with cols[i]:  # แสดงแต่ละค่าในคอลัมน์ของตัวเอง
+            st.markdown(
+                f"""    
+                <div class="rate-box">
+                    {rate} <br>THB
+                </div>
+                """,
+                unsafe_allow_html=True
+            )
+            st.caption(updated[currency])  # ความสดใหม่ของข้อมูลแต่ละคู่
+
+
+rate_boxes()
\ No newline at end of file
@@ -0,0 +1,118 @@
+"""
+Cross rates triangulated from legs against one pivot currency.
+
+With N legs (EUR/THB, JPY/THB, ...) downloaded, any of the N x N crosses is a division on
+the legs' shared index: EUR/JPY = EURTHB / JPYTHB. A ``Triangulator`` aligns the legs' OHLC
+columns once and derives crosses on demand, keeping the most recently used ones.
+
+Open and Close of a cross are exact: both legs are sampled at the same instant. High and
+Low are not, because the legs need not reach their extremes at the same moment. Two modes:
+
+* ``"ohlc"`` (default): High = base High / quote Low and Low = base Low / quote High, the
+  widest range the cross could have traded in. It is exact for inverted legs (THB/JPY)
+  and otherwise an outer bound.
+* ``"close"``: close-only bars. Open is the previous Close, High/Low the Open/Close range.
+"""
+
+import threading
+from collections import OrderedDict
+
+import numpy as np
+import pandas as pd
+
+from compact import DEFAULT_BAR_DTYPE, CompactBars
+from data_provider import OHLC_COLUMNS
+
+CROSS_MODES = ("ohlc", "close")
+DEFAULT_CROSS_MODE = "ohlc"
+# Derived crosses kept per Triangulator
+CROSS_CACHE_SIZE = 512
+
+_FIELDS = ["Open", "High", "Low", "Close"]
+
+
+class Triangulator:
+    def __init__(self, legs, pivot, mode=DEFAULT_CROSS_MODE, cache_size=CROSS_CACHE_SIZE, dtype=DEFAULT_BAR_DTYPE):
+        """``legs`` maps a currency to its ``<currency><pivot>`` OHLC frame; crosses are ``dtype`` bars."""
+        if mode not in CROSS_MODES:
+            raise ValueError(f"Unknown cross mode: {mode}")
+        self.pivot = pivot
+        self.mode = mode
+        self.dtype = dtype
+        self.cache_size = cache_size
+        self.currencies = (pivot,) + tuple(currency for currency in legs if currency != pivot)
+        self._rows = {currency: i for i, currency in enumerate(self.currencies)}
+        self._cache = OrderedDict()
+        self._lock = threading.Lock()
+
+        # (4, currencies, bars) Open/High/Low/Close on the union of every leg's bars; the pivot row is 1
+        frames = [frame[~frame.index.duplicated(keep="last")] for frame in legs.values() if not frame.empty]
+        index = frames[0].index if frames else pd.DatetimeIndex([])
+        for frame in frames[1:]:
+            index = index.union(frame.index)
+        self.index = index
+        self._times = index.as_unit("ns").asi8 if len(index) else np.empty(0, dtype=np.int64)
+        self._tz = index.tz or "UTC"
+        self.ohlc = np.full((4, len(self.currencies), len(index)), np.nan)
+        self.ohlc[:, 0] = 1.0
+        self.observed = np.zeros((len(self.currencies), len(index)), dtype=bool)
+        self.observed[0] = True
+        for currency, frame in legs.items():
+            if currency == pivot or frame.empty:
+                continue
+            frame = frame[~frame.index.duplicated(keep="last")]
+            row, positions = self._rows[currency], index.get_indexer(frame.index)
+            self.ohlc[:, row, positions] = frame[_FIELDS].to_numpy(dtype=float).T
+            self.observed[row, positions] = True
+
+    def cross(self, base, quote):
+        """OHLC frame of ``base/quote`` on the bars both legs printed; empty when a leg has no data."""
+        key = (base, quote)
+        with self._lock:
+            if key in self._cache:
+                self._cache.move_to_end(key)
+                return self._cache[key]
+        bars = self._derive(self._rows[base], self._rows[quote])
+        with self._lock:
+            self._cache[key] = bars
+            while len(self._cache) > self.cache_size:
+                self._cache.popitem(last=False)
+        return bars
+
+    def _derive(self, b, q):
+        positions = np.flatnonzero(self.observed[b] & self.observed[q])
+        if not len(positions):
+            return pd.DataFrame(columns=OHLC_COLUMNS)
+        (open_b, high_b, low_b, close_b), (open_q, high_q, low_q, close_q) = (self.ohlc[:, r, positions] for r in (b, q))
+        close = close_b / close_q
+        if self.mode == "close":
+            open_ = np.concatenate([close[:1], close[:-1]])
+            high, low = np.fmax(open_, close), np.fmin(open_, close)
+        else:
+            open_ = open_b / open_q
+            # Widened to the Open/Close in case a leg's own High/Low is inconsistent with them
+            high = np.fmax(high_b / low_q, np.fmax(open_, close))
+            low = np.fmin(low_b / high_q, np.fmin(open_, close))
+        # Read-only OHLC bars (no Volume/Dividends columns, FX crosses have none), shared by every session
+        return CompactBars.from_arrays(self._times[positions], np.stack([open_, high, low, close]), self._tz, self.dtype).frame()
+
+    # --- Cross matrix ---
+    def latest(self):
+        """``(latest, previous)`` Close each currency printed against the pivot (1 for the pivot)."""
+        latest = np.full(len(self.currencies), np.nan)
+        previous = np.full(len(self.currencies), np.nan)
+        for row, observed in enumerate(self.observed):
+            closes = self.ohlc[3, row, observed]
+            if len(closes):
+                latest[row] = closes[-1]
+                previous[row] = closes[-2] if len(closes) >= 2 else closes[-1]
+        return latest, previous
+
+    def cross_matrix(self):
+        """``(rates, change %)`` DataFrames of every base (rows) / quote (columns) cross, one division each."""
+        latest, previous = self.latest()
+        rates = latest[:, None] / latest[None, :]
+        with np.errstate(divide="ignore", invalid="ignore"):
+            change = (rates / (previous[:, None] / previous[None, :]) - 1) * 100
+        labels = list(self.currencies)
+        return pd.DataFrame(rates, index=labels, columns=labels), pd.DataFrame(change, index=labels, columns=labels)
@@ -0,0 +1,108 @@
+"""
+Currency universe of the dashboards, loaded from ``currencies.json`` (or ``EXCHANGE_UNIVERSE``).
+
+Only the legs against the pivot currency (THB) are downloaded. Every cross between two
+currencies that have a leg is derived locally (see ``triangulation.py``), e.g. EUR/JPY =
+EURTHB / JPYTHB, so adding a pair costs no extra upstream request. A pair without legs
+falls back to its own ticker.
+"""
+
+import json
+import os
+from dataclasses import dataclass
+
+import pandas as pd
+
+from data_provider import OHLC_COLUMNS
+from triangulation import DEFAULT_CROSS_MODE, Triangulator
+
+DEFAULT_UNIVERSE_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "currencies.json")
+
+
+def yahoo_ticker(base, quote):
+    return f"{base}{quote}=X"
+
+
+@dataclass(frozen=True)
+class Pair:
+    name: str  # "EUR/JPY"
+    base: str
+    quote: str
+    ticker: str = None  # downloaded directly (a pivot leg or a pair without legs)
+    legs: tuple = ()  # (base leg, quote leg) tickers a derived cross is divided from; None stands for the pivot (rate 1)
+
+    @property
+    def tickers(self):
+        """Every downloaded ticker this pair's bars come from."""
+        return (self.ticker,) if self.ticker else tuple(leg for leg in self.legs if leg)
+
+
+@dataclass(frozen=True)
+class Universe:
+    pivot: str
+    pairs: tuple  # Pair, in display order
+    legs: tuple = ()  # currencies configured with a <currency><pivot> leg
+    cross_mode: str = DEFAULT_CROSS_MODE  # how derived crosses get their High/Low, see triangulation.py
+
+    @property
+    def names(self):
+        return [pair.name for pair in self.pairs]
+
+    @property
+    def tickers(self):
+        """Unique tickers to download for every pair of the universe."""
+        return tuple(dict.fromkeys(ticker for pair in self.pairs for ticker in pair.tickers))
+
+    def select(self, names):
+        """Universe limited to ``names`` (unknown names are ignored), keeping the configured order."""
+        names = set(names)
+        return Universe(self.pivot, tuple(pair for pair in self.pairs if pair.name in names), self.legs, self.cross_mode)
+
+    def triangulator(self, downloaded):
+        """``Triangulator`` over every leg among the ``{ticker: DataFrame}`` downloads."""
+        legs = {currency: downloaded[yahoo_ticker(currency, self.pivot)] for currency in self.legs
+                if yahoo_ticker(currency, self.pivot) in downloaded}
+        return Triangulator(legs, self.pivot, self.cross_mode)
+
+    def frames(self, downloaded, triangulator=None):
+        """``{pair name: OHLC DataFrame}`` from ``{ticker: DataFrame}``, deriving the crosses."""
+        empty = pd.DataFrame(columns=OHLC_COLUMNS)
+        frames = {}
+        for pair in self.pairs:
+            if pair.ticker:
+                frames[pair.name] = downloaded.get(pair.ticker, empty)
+            else:
+                triangulator = triangulator or self.triangulator(downloaded)
+                frames[pair.name] = triangulator.cross(pair.base, pair.quote)
+        return frames
+
+    def pair(self, name):
+        return next(pair for pair in self.pairs if pair.name == name)
+
+    def age(self, snapshot, pair_name):
+        """Age of a pair's data in a refresher ``Snapshot``: its oldest leg."""
+        pair = self.pair(pair_name)
+        ages = [snapshot.age(ticker) for ticker in pair.tickers]
+        return None if None in ages else max(ages)
+
+
+def parse_pair(name, pivot, legs):
+    base, quote = name.split("/")
+    if quote == pivot and base in legs:
+        return Pair(name, base, quote, ticker=yahoo_ticker(base, pivot))
+    if base == pivot and quote in legs:
+        return Pair(name, base, quote, legs=(None, yahoo_ticker(quote, pivot)))
+    if base in legs and quote in legs:
+        return Pair(name, base, quote, legs=(yahoo_ticker(base, pivot), yahoo_ticker(quote, pivot)))
+    return Pair(name, base, quote, ticker=yahoo_ticker(base, quote))
+
+
+def load_universe(path=None, key="pairs"):
+    """Universe of the list ``key`` in the config file (``pairs`` for main.py, ``board`` for test.py)."""
+    path = path or os.environ.get("EXCHANGE_UNIVERSE", DEFAULT_UNIVERSE_PATH)
+    with open(path) as f:
+        config = json.load(f)
+    pivot, legs = config["pivot"], tuple(config.get("legs", []))
+    pairs = tuple(parse_pair(name, pivot, legs) for name in config[key])
+    return Universe(pivot, pairs, legs, config.get("cross_ohlc", DEFAULT_CROSS_MODE))
+